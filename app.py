@@ -6,28 +6,44 @@ Refactored modular structure for cPanel deployment
 import os
 import sys
 import time
+import uuid
 import logging
-from datetime import datetime
-from flask import Flask, request, jsonify, make_response, session
+import orjson
+from flask import Flask, Response, request, jsonify, make_response, session, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
+from flask_session import Session
 from werkzeug.exceptions import BadRequest, TooManyRequests, Unauthorized
 
 # Import our modules
 from config import Config
-from database import DatabaseService
+from database import DatabaseService, BookingConflictError
 from validators import (
     validate_booking_data, validate_car_data, validate_contact_form_data,
-    validate_booking_update_data, validate_date_format
+    validate_booking_update_data, validate_date_format, parse_car_form, is_valid_uuid, parse_timestamp
 )
 from email_service import EmailService
 from auth import admin_required, admin_login, admin_logout, get_admin_status
 from utils import (
-    get_client_ip, calculate_total_price, check_rate_limit,
-    upload_multiple_images, delete_image_simple, get_usage_statistics
+    redis_client, rate_limit_storage, get_client_ip, check_rate_limit, now_iso,
+    upload_multiple_images, delete_images, delete_images_async, get_usage_statistics
 )
 
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        # Types orjson can't handle natively (Decimal, dataclasses, ...) use Flask's default
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # Configure Flask app
 app.config.update(
@@ -39,6 +55,26 @@ app.config.update(
     PERMANENT_SESSION_LIFETIME=Config.PERMANENT_SESSION_LIFETIME
 )
 
+# Compress JSON responses (brotli/gzip per Accept-Encoding); small bodies aren't worth it
+app.config.update(
+    COMPRESS_MIMETYPES=['application/json'],
+    COMPRESS_ALGORITHM=['br', 'gzip'],
+    COMPRESS_LEVEL=5,
+    COMPRESS_BR_LEVEL=5,
+    COMPRESS_MIN_SIZE=1024
+)
+Compress(app)
+
+# Keep admin sessions server-side in Redis when available; the cookie then
+# only carries the session id. Without Redis, Flask's signed cookie is used.
+if redis_client is not None:
+    app.config.update(
+        SESSION_TYPE='redis',
+        SESSION_REDIS=redis_client,
+        SESSION_KEY_PREFIX='session:'
+    )
+    Session(app)
+
 # Configure CORS
 CORS(app, 
      origins=Config.CORS_ORIGINS,
@@ -67,17 +103,23 @@ except Exception as e:
     db_service = None
     email_service = None
 
+# Static preflight headers, built once
+_PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Headers': "Content-Type,Authorization,X-Requested-With,Accept,Origin,Cache-Control",
+    'Access-Control-Allow-Methods': "GET,POST,PUT,DELETE,OPTIONS,HEAD,PATCH",
+    'Access-Control-Allow-Credentials': 'true',
+    'Access-Control-Max-Age': '86400'
+}
+
 # Add explicit OPTIONS handler for all admin routes
 @app.before_request
 def handle_preflight():
     """Handle CORS preflight requests"""
     if request.method == "OPTIONS":
-        response = make_response()
-        response.headers.add("Access-Control-Allow-Origin", request.headers.get('Origin', '*'))
-        response.headers.add('Access-Control-Allow-Headers', "Content-Type,Authorization,X-Requested-With,Accept,Origin,Cache-Control")
-        response.headers.add('Access-Control-Allow-Methods', "GET,POST,PUT,DELETE,OPTIONS,HEAD,PATCH")
-        response.headers.add('Access-Control-Allow-Credentials', 'true')
-        response.headers.add('Access-Control-Max-Age', '86400')
+        response = make_response('', 204)
+        response.headers.update(_PREFLIGHT_HEADERS)
+        # flask-cors skips responses that already carry an allowed origin
+        response.headers['Access-Control-Allow-Origin'] = request.headers.get('Origin', '*')
         return response
 
 # ADMIN API ENDPOINTS
@@ -124,8 +166,9 @@ def admin_get_cars():
         if not db_service:
             return jsonify({"error": "Database not available"}), 503
         
-        cars = db_service.get_admin_client().table('cars').select('*').order('created_at', desc=True).execute().data
-        stats = db_service.get_car_statistics()
+        result = db_service.get_admin_cars_with_stats()
+        cars = result['cars']
+        stats = result['statistics']
         
         logger.info(f"Retrieved {len(cars)} cars for admin (active: {stats['active']}, inactive: {stats['inactive']})")
         
@@ -149,26 +192,8 @@ def admin_create_car():
         
         # Handle multipart/form-data for file upload
         if request.content_type and request.content_type.startswith('multipart/form-data'):
-            car_data = {}
-            
             # Extract form fields
-            for key in request.form:
-                value = request.form[key]
-                if key == 'features' and value:
-                    try:
-                        import json
-                        car_data[key] = json.loads(value)
-                    except json.JSONDecodeError:
-                        car_data[key] = [feature.strip() for feature in value.split(',') if feature.strip()]
-                elif key in ['year', 'price_per_day', 'deposit_amount', 'seats', 'large_luggage', 'small_luggage', 'doors', 'min_age']:
-                    try:
-                        car_data[key] = float(value) if key in ['price_per_day', 'deposit_amount'] else int(value)
-                    except (ValueError, TypeError):
-                        pass
-                elif key in ['is_active', 'four_wd', 'ac']:
-                    car_data[key] = value.lower() in ['true', '1', 'yes', 'on']
-                else:
-                    car_data[key] = value
+            car_data = parse_car_form(request.form)
             
             uploaded_images = request.files.getlist('images')
         else:
@@ -187,29 +212,26 @@ def admin_create_car():
         
         # Handle image upload if provided
         if uploaded_images and any(img.filename for img in uploaded_images):
+            # Generate the ID up front so images can be uploaded before the single insert
+            car_id = str(uuid.uuid4())
+            validated_data['id'] = car_id
+            
             try:
-                # Create car first
-                car = db_service.create_car(validated_data)
-                car_id = car['id']
-                
-                # Upload multiple images and update car
                 image_urls = upload_multiple_images(uploaded_images, car_id)
-                
-                # Update car with image URLs
-                updated_car = db_service.update_car(car_id, {'image_urls': image_urls})
-                
-                logger.info(f"Car created with {len(image_urls)} images: {car['brand']} {car['model']} (ID: {car_id})")
-                car = updated_car
-                
             except Exception as e:
                 logger.error(f"Image upload failed: {e}")
-                # Delete the created car since image upload failed
-                try:
-                    db_service.delete_car(car_id)
-                    logger.info(f"Deleted car {car_id} due to image upload failure")
-                except Exception as delete_error:
-                    logger.error(f"Failed to delete car {car_id} after image upload failure: {delete_error}")
                 return jsonify({"error": f"Image upload failed: {str(e)}"}), 400
+            
+            validated_data['image_urls'] = image_urls
+            
+            try:
+                car = db_service.create_car(validated_data)
+            except Exception:
+                # Remove the uploaded images since the car was not created
+                delete_images(image_urls)
+                raise
+            
+            logger.info(f"Car created with {len(image_urls)} images: {car['brand']} {car['model']} (ID: {car_id})")
         else:
             # Create car without images
             car = db_service.create_car(validated_data)
@@ -239,10 +261,7 @@ def admin_update_car(car_id):
             return jsonify({"error": "Database not available"}), 503
         
         # Validate car_id format
-        try:
-            import uuid
-            uuid.UUID(car_id)
-        except ValueError:
+        if not is_valid_uuid(car_id):
             return jsonify({"error": "Invalid car ID format"}), 400
         
         # Check if car exists
@@ -253,58 +272,31 @@ def admin_update_car(car_id):
         existing_car = existing_car[0]
         
         # Parse request data based on content type
-        if request.content_type and request.content_type.startswith('multipart/form-data'):
-            car_data = {}
-            
+        is_multipart = bool(request.content_type and request.content_type.startswith('multipart/form-data'))
+        json_body = None
+        if is_multipart:
             # Extract form fields
-            for key in request.form:
-                value = request.form[key]
-                if key == 'features' and value:
-                    try:
-                        import json
-                        car_data[key] = json.loads(value)
-                    except json.JSONDecodeError:
-                        car_data[key] = [feature.strip() for feature in value.split(',') if feature.strip()]
-                elif key == 'image_urls' and value:
-                    # Parse image_urls from frontend
-                    try:
-                        car_data[key] = json.loads(value) if value != 'null' else []
-                    except json.JSONDecodeError:
-                        car_data[key] = []
-                elif key in ['year', 'price_per_day', 'deposit_amount', 'seats', 'large_luggage', 'small_luggage', 'doors', 'min_age']:
-                    try:
-                        car_data[key] = float(value) if key in ['price_per_day', 'deposit_amount'] else int(value)
-                    except (ValueError, TypeError):
-                        pass
-                elif key in ['is_active', 'four_wd', 'ac']:
-                    car_data[key] = value.lower() in ['true', '1', 'yes', 'on']
-                else:
-                    car_data[key] = value
+            car_data = parse_car_form(request.form)
             
             # Get uploaded files
             uploaded_images = request.files.getlist('images') or []
             uploaded_images = [img for img in uploaded_images if img and img.filename]  # Filter empty files
         else:
-            # Handle JSON data
-            car_data = request.get_json()
-            if not car_data:
+            # Handle JSON data (decoded once and reused below)
+            json_body = request.get_json()
+            if not json_body:
                 return jsonify({"error": "No data provided"}), 400
+            car_data = json_body
             uploaded_images = []
         
-        # Remove empty fields (but keep image_urls even if empty array)
+        # Remove empty fields (but keep image_urls even if empty array);
+        # multipart image_urls were already decoded by parse_car_form
+        sent_image_urls = 'image_urls' in (request.form if is_multipart else json_body)
+        image_urls = car_data.get('image_urls', [])
         car_data = {k: v for k, v in car_data.items() 
                    if v is not None and v != '' and k != 'image_urls'} or {}
-        
-        # Special handling for image_urls - keep even if empty array
-        if 'image_urls' in request.form or (request.get_json() and 'image_urls' in request.get_json()):
-            if request.content_type and request.content_type.startswith('multipart/form-data'):
-                value = request.form.get('image_urls', '[]')
-                try:
-                    car_data['image_urls'] = json.loads(value) if value != 'null' else []
-                except json.JSONDecodeError:
-                    car_data['image_urls'] = []
-            else:
-                car_data['image_urls'] = request.get_json().get('image_urls', [])
+        if sent_image_urls:
+            car_data['image_urls'] = image_urls
         
         update_data = {}
         
@@ -341,6 +333,7 @@ def admin_update_car(car_id):
                 return jsonify({"error": f"Image upload failed: {str(e)}"}), 400
         
         # Step 2: Determine final image URLs based on frontend changes
+        removed_urls = []
         if 'image_urls' in car_data:
             # Frontend has made changes (deletions/reordering)
             frontend_urls = car_data['image_urls']
@@ -353,13 +346,7 @@ def admin_update_car(car_id):
             removed_urls = [url for url in existing_urls if url not in frontend_urls]
             
             if removed_urls:
-                logger.info(f"  Deleting removed images: {removed_urls}")
-                for removed_url in removed_urls:
-                    try:
-                        delete_image_simple(removed_url)
-                        logger.info(f"    Deleted: {removed_url}")
-                    except Exception as e:
-                        logger.warning(f"    Failed to delete {removed_url}: {e}")
+                logger.info(f"  Removed images (deleted after the update): {removed_urls}")
             
             # Check if frontend wants to reorder images (main_image_index parameter)
             main_image_index = car_data.get('main_image_index')
@@ -412,6 +399,10 @@ def admin_update_car(car_id):
             updated_car = existing_car
             logger.info(f"No changes to update for car {car_id}")
         
+        # Step 6: Remove dropped images from storage in the background
+        if removed_urls:
+            delete_images_async(removed_urls)
+        
         logger.info(f"Car update completed by admin: Car ID {car_id}")
         
         return jsonify({
@@ -437,31 +428,22 @@ def admin_delete_car(car_id):
         if not db_service:
             return jsonify({"error": "Database not available"}), 503
         
-        try:
-            import uuid
-            uuid.UUID(car_id)
-        except ValueError:
+        if not is_valid_uuid(car_id):
             return jsonify({"error": "Invalid car ID format"}), 400
         
-        # Check if car exists using admin client
-        existing_car = db_service.get_admin_client().table('cars').select('*').eq('id', car_id).execute().data
-        if not existing_car:
-            return jsonify({"error": "Car not found"}), 404
-        
-        car = existing_car[0]
-        
         # Check for existing bookings using admin client
-        bookings = db_service.get_admin_client().table('bookings').select('id').eq('car_id', car_id).in_('status', ['confirmed', 'pending']).execute().data
+        bookings = db_service.get_admin_client().table('bookings').select('id').eq('car_id', car_id).in_('status', ['confirmed', 'pending']).limit(1).execute().data
         if bookings:
             return jsonify({"error": "Cannot delete car with existing bookings"}), 409
         
-        # Delete images if exist
-        if car.get('image_urls'):
-            for image_url in car['image_urls']:
-                delete_image_simple(image_url)
+        # Delete car record using admin client (service role key); no row means no such car
+        car = db_service.delete_car(car_id)
+        if not car:
+            return jsonify({"error": "Car not found"}), 404
         
-        # Delete car record using admin client (service role key)
-        db_service.delete_car(car_id)
+        # Delete images in the background once the record is gone
+        if car.get('image_urls'):
+            delete_images_async(car['image_urls'])
         
         logger.info(f"Car deleted by admin: {car['brand']} {car['model']} (ID: {car_id})")
         
@@ -485,19 +467,9 @@ def admin_update_booking(booking_id):
         if not db_service:
             return jsonify({"error": "Database not available"}), 503
         
-        try:
-            import uuid
-            uuid.UUID(booking_id)
-        except ValueError:
+        if not is_valid_uuid(booking_id):
             return jsonify({"error": "Invalid booking ID format"}), 400
         
-        # Check if booking exists using admin client
-        existing_booking = db_service.get_admin_client().table('bookings').select('*').eq('id', booking_id).execute().data
-        if not existing_booking:
-            return jsonify({"error": "Booking not found"}), 404
-        
-        existing_booking = existing_booking[0]
-        
         # Get update data
         data = request.get_json()
         if not data:
@@ -508,8 +480,10 @@ def admin_update_booking(booking_id):
         
         logger.info(f"Updating booking {booking_id} with data: {update_data}")
         
-        # Use admin client for update operations (bypasses RLS)
+        # Use admin client for update operations (bypasses RLS); no row means no such booking
         updated_booking = db_service.update_booking(booking_id, update_data)
+        if not updated_booking:
+            return jsonify({"error": "Booking not found"}), 404
         
         logger.info(f"Successfully updated booking {booking_id}. New values: {updated_booking}")
         logger.info(f"Booking updated by admin: Booking ID {booking_id}, Changes: {list(update_data.keys())}")
@@ -540,22 +514,18 @@ def admin_delete_booking(booking_id):
         if not data or data.get('status') != 'deleted':
             return jsonify({"error": "Invalid request. Expected status: 'deleted'"}), 400
         
-        # Check if booking exists using admin client
-        existing_booking = db_service.get_admin_client().table('bookings').select('*').eq('id', booking_id).execute().data
-        if not existing_booking:
-            logger.warning(f"Booking {booking_id} not found")
-            return jsonify({"error": "Booking not found"}), 404
-        
-        existing_booking = existing_booking[0]
+        # Soft delete by setting status to 'deleted'
+        deleted_booking = db_service.soft_delete_booking(booking_id)
         
-        # Check if already deleted
-        if existing_booking.get('status') == 'deleted':
+        # Nothing updated - look the booking up only to report why
+        if not deleted_booking:
+            existing_booking = db_service.get_admin_client().table('bookings').select('status').eq('id', booking_id).execute().data
+            if not existing_booking:
+                logger.warning(f"Booking {booking_id} not found")
+                return jsonify({"error": "Booking not found"}), 404
             logger.warning(f"Booking {booking_id} is already deleted")
             return jsonify({"error": "Booking is already deleted"}), 400
         
-        # Soft delete by setting status to 'deleted'
-        deleted_booking = db_service.soft_delete_booking(booking_id)
-        
         logger.info(f"Successfully soft deleted booking {booking_id}")
         logger.info(f"Booking soft deleted by admin: Booking ID {booking_id}")
         
@@ -579,53 +549,108 @@ def admin_get_bookings():
         if not db_service:
             return jsonify({"error": "Database not available"}), 503
         
-        # Get query parameters
-        filters = {
-            'status': request.args.get('status'),
-            'car_id': request.args.get('car_id'),
-            'start_date': request.args.get('start_date'),
-            'end_date': request.args.get('end_date')
-        }
-        
-        # Remove None values
-        filters = {k: v for k, v in filters.items() if v is not None}
-        
-        limit = min(int(request.args.get('limit', 100)), 500)  # Max 500 records
-        offset = max(int(request.args.get('offset', 0)), 0)
+        filters, limit, offset, cursor = _booking_list_args()
         
-        # Get bookings with filters
-        bookings = db_service.get_bookings_filtered(filters, limit, offset)
-        
-        # Get statistics
-        stats = db_service.get_booking_statistics(filters)
+        # Get bookings with filters and statistics in parallel
+        bookings, stats = db_service.get_bookings_with_statistics(filters, limit, offset, cursor)
         
         return jsonify({
             "bookings": bookings,
             "pagination": {
                 "limit": limit,
                 "offset": offset,
-                "returned": len(bookings)
+                "returned": len(bookings),
+                # Pass back as query parameters to fetch the next page
+                "next_cursor": _next_cursor(bookings, limit)
             },
             "filters": filters,
             "statistics": stats
         })
         
+    except BadRequest as e:
+        return jsonify({"error": e.description}), 400
     except Exception as e:
         logger.error(f"Error getting bookings for admin: {e}")
         return jsonify({"error": "Failed to fetch bookings"}), 500
 
+@app.route('/admin/bookings.ndjson', methods=['GET'])
+@admin_required
+def admin_get_bookings_ndjson():
+    """Same bookings page as /admin/bookings, streamed as one JSON object per line (no statistics)"""
+    try:
+        if not db_service:
+            return jsonify({"error": "Database not available"}), 503
+        
+        filters, limit, offset, cursor = _booking_list_args()
+        bookings = db_service.get_bookings_filtered(filters, limit, offset, cursor)
+        
+        def generate():
+            for booking in bookings:
+                yield app.json.dumps(booking) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except BadRequest as e:
+        return jsonify({"error": e.description}), 400
+    except Exception as e:
+        logger.error(f"Error streaming bookings for admin: {e}")
+        return jsonify({"error": "Failed to fetch bookings"}), 500
+
+def _booking_list_args():
+    """Parse filters and pagination for the admin bookings list"""
+    # Get query parameters
+    filters = {
+        'status': request.args.get('status'),
+        'car_id': request.args.get('car_id'),
+        'start_date': request.args.get('start_date'),
+        'end_date': request.args.get('end_date')
+    }
+    
+    # Remove None values
+    filters = {k: v for k, v in filters.items() if v is not None}
+
+    # car_id is a UUID column - reject malformed values instead of sending them to Postgres
+    if 'car_id' in filters and not is_valid_uuid(filters['car_id']):
+        raise BadRequest("Invalid car_id")
+
+    limit = min(int(request.args.get('limit', 100)), 500)  # Max 500 records
+    offset = max(int(request.args.get('offset', 0)), 0)
+
+    # Keyset cursor: created_at and id of the last booking on the previous page (takes precedence over offset)
+    cursor = None
+    before_created_at = request.args.get('before_created_at')
+    before_id = request.args.get('before_id')
+    if before_created_at is not None:
+        try:
+            before_created_at = _cursor_timestamp(before_created_at)
+        except ValueError:
+            raise BadRequest("Invalid before_created_at (URL-encode a '+' offset or use a Z suffix)")
+        if before_id is not None and not is_valid_uuid(before_id):
+            raise BadRequest("Invalid before_id")
+        cursor = (before_created_at, before_id)
+    return filters, limit, offset, cursor
+
+def _next_cursor(bookings, limit):
+    """Query parameters for the page after this one, or None on the last page"""
+    if len(bookings) < limit:
+        return None
+    last = bookings[-1]
+    return {'before_created_at': _cursor_timestamp(last['created_at']), 'before_id': last['id']}
+
+def _cursor_timestamp(value):
+    """Canonical UTC form of a cursor timestamp; a Z suffix survives unencoded query strings,
+    where a '+' offset would turn into a space"""
+    return parse_timestamp(value).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
 # PUBLIC API ENDPOINTS
 
+# Only the timestamp varies, so the root payload is a preformatted template
+_ROOT_TEMPLATE = '{"message":"Sof Car API","version":"1.2.0","status":"running","timestamp":"%s","admin_endpoints":"/admin/*"}'
+
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint"""
-    return jsonify({
-        "message": "Sof Car API",
-        "version": "1.2.0",
-        "status": "running",
-        "timestamp": datetime.now().isoformat(),
-        "admin_endpoints": "/admin/*"
-    })
+    return Response(_ROOT_TEMPLATE % now_iso(), mimetype='application/json')
 
 @app.route('/cars', methods=['GET'])
 def get_cars():
@@ -646,12 +671,9 @@ def get_cars():
         # Get all active cars
         all_cars = db_service.get_cars(include_inactive=False, car_class=car_class)
         
-        # Filter cars by availability for the requested dates
-        available_cars = []
-        for car in all_cars:
-            is_available, _ = db_service.check_car_availability(car['id'], start_date, end_date)
-            if is_available:
-                available_cars.append(car)
+        # Filter cars by availability for the requested dates (one bookings query for all cars)
+        unavailable_ids = db_service.get_unavailable_car_ids([car['id'] for car in all_cars], start_date, end_date)
+        available_cars = [car for car in all_cars if car['id'] not in unavailable_ids]
         
         logger.info(f"Found {len(available_cars)} available cars out of {len(all_cars)} total cars for dates {start_date} to {end_date}")
         
@@ -683,6 +705,25 @@ def get_all_cars():
         logger.error(f"Error getting all cars: {e}")
         return jsonify({"error": "Failed to fetch all cars"}), 500
 
+@app.route('/cars/classes', methods=['GET'])
+def get_car_classes():
+    """Get active car counts per class for faceted filtering"""
+    try:
+        if not db_service:
+            return jsonify({"error": "Database not available"}), 503
+
+        classes = db_service.get_car_class_counts()
+
+        response = jsonify({
+            "classes": classes,
+            "total": len(classes)
+        })
+        response.headers['Cache-Control'] = 'public, max-age=60'
+        return response
+    except Exception as e:
+        logger.error(f"Error getting car classes: {e}")
+        return jsonify({"error": "Failed to fetch car classes"}), 500
+
 @app.route('/cars/<car_id>', methods=['GET'])
 def get_car(car_id):
     """Get specific car by ID"""
@@ -690,10 +731,7 @@ def get_car(car_id):
         if not db_service:
             return jsonify({"error": "Database not available"}), 503
         
-        try:
-            import uuid
-            uuid.UUID(car_id)
-        except ValueError:
+        if not is_valid_uuid(car_id):
             return jsonify({"error": "Invalid car ID format"}), 400
         
         car = db_service.get_car_by_id(car_id)
@@ -712,10 +750,7 @@ def get_car_availability(car_id):
         if not db_service:
             return jsonify({"error": "Database not available"}), 503
         
-        try:
-            import uuid
-            uuid.UUID(car_id)
-        except ValueError:
+        if not is_valid_uuid(car_id):
             return jsonify({"error": "Invalid car ID format"}), 400
         
         start_date = request.args.get('start_date')
@@ -728,27 +763,23 @@ def get_car_availability(car_id):
         if not validate_date_format(start_date) or not validate_date_format(end_date):
             return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
         
-        # Get car details
-        car = db_service.get_car_by_id(car_id)
-        if not car:
+        # Car details, availability and pricing in a single round-trip
+        availability = db_service.get_car_availability(car_id, start_date, end_date)
+        if not availability:
             return jsonify({"error": "Car not found"}), 404
-        
-        # Check availability
-        is_available, error_msg = db_service.check_car_availability(car_id, start_date, end_date)
-        
+
         result = {
-            "car": car,
+            "car": availability['car'],
             "start_date": start_date,
             "end_date": end_date,
-            "is_available": is_available
+            "is_available": availability['is_available']
         }
-        
-        if is_available:
-            total_price = calculate_total_price(car['price_per_day'], start_date, end_date)
-            result["total_price"] = total_price
-            result["rental_days"] = (datetime.strptime(end_date, '%Y-%m-%d').date() - datetime.strptime(start_date, '%Y-%m-%d').date()).days
+
+        if availability['is_available']:
+            result["total_price"] = float(availability['total_price'])
+            result["rental_days"] = availability['rental_days']
         else:
-            result["error"] = error_msg
+            result["error"] = availability['reason']
         
         return jsonify(result)
         
@@ -775,80 +806,44 @@ def create_booking():
         
         car_id = validated_data['car_id']
         
-        # Simple lock mechanism (in production use Redis or database locks)
-        from utils import booking_locks
-        if car_id in booking_locks:
-            return jsonify({"error": "Car is being booked by another user. Please try again."}), 409
-        
-        booking_locks[car_id] = time.time()
+        # Create booking with all necessary data; rental days, total price and
+        # deposit are filled in from the car row by the database
+        booking_data = {
+            'car_id': car_id,
+            'start_date': validated_data['start_date'],
+            'end_date': validated_data['end_date'],
+            'client_last_name': validated_data['client_last_name'].strip(),
+            'client_first_name': validated_data['client_first_name'].strip(),
+            'client_email': validated_data['client_email'].strip().lower(),
+            'client_phone': validated_data['client_phone'].strip(),
+            'status': 'pending',  # Start as pending, confirm after payment
+            'payment_method': validated_data.get('payment_method', 'cash'),
+            'deposit_status': 'pending',
+            'ip_address': get_client_ip(),
+            'notes': validated_data.get('notes', ''),
+            'created_at': now_iso()
+        }
         
+        # Look up the car and insert in one round-trip - the database rejects overlapping dates atomically
         try:
-            # Get car details
-            car = db_service.get_car_by_id(car_id)
-            if not car:
-                return jsonify({"error": "Car not found"}), 404
-            
-            # Atomic availability check
-            is_available, error_msg = db_service.check_car_availability(
-                car_id, validated_data['start_date'], validated_data['end_date']
-            )
-            if not is_available:
-                return jsonify({"error": error_msg}), 409
-            
-            # Calculate total price
-            total_price = calculate_total_price(car['price_per_day'], validated_data['start_date'], validated_data['end_date'])
-            rental_days = (datetime.strptime(validated_data['end_date'], '%Y-%m-%d').date() - datetime.strptime(validated_data['start_date'], '%Y-%m-%d').date()).days
-            
-            # Create booking with all necessary data
-            booking_data = {
-                'car_id': car_id,
-                'start_date': validated_data['start_date'],
-                'end_date': validated_data['end_date'],
-                'rental_days': rental_days,
-                'client_last_name': validated_data['client_last_name'].strip(),
-                'client_first_name': validated_data['client_first_name'].strip(),
-                'client_email': validated_data['client_email'].strip().lower(),
-                'client_phone': validated_data['client_phone'].strip(),
-                'total_price': total_price,
-                'status': 'pending',  # Start as pending, confirm after payment
-                'payment_method': validated_data.get('payment_method', 'cash'),
-                'deposit_amount': car['deposit_amount'],
-                'deposit_status': 'pending',
-                'ip_address': get_client_ip(),
-                'notes': validated_data.get('notes', ''),
-                'created_at': datetime.now().isoformat()
-            }
-            
-            # Insert booking
-            booking = db_service.create_booking(booking_data)
-            
-            logger.info(f"Booking created: SOF{booking['id'][:8].upper()} for car {car_id} by {booking['client_email']}")
-            
-            # Send emails (non-blocking)
-            try:
-                # Send booking confirmation to client
-                email_service.send_booking_confirmation_email(booking, car)
-                # Send admin notification
-                email_service.send_admin_notification_email(booking, car)
-                logger.info(f"Emails sent for booking SOF{booking['id'][:8].upper()}")
-            except Exception as e:
-                logger.error(f"Failed to send emails for booking SOF{booking['id'][:8].upper()}: {e}")
-                # Don't fail the booking if email fails
-            
-            return jsonify({
-                "success": True,
-                "booking": booking,
-                "message": "Booking created successfully",
-                "next_steps": "Please proceed with payment confirmation"
-            }), 201
-                
-        except Exception as e:
-            logger.error(f"Error in booking creation: {e}")
-            return jsonify({"error": "Failed to create booking", "details": str(e)}), 500
-        finally:
-            # Release lock
-            if car_id in booking_locks:
-                del booking_locks[car_id]
+            booking = db_service.create_booking_atomic(booking_data)
+        except BookingConflictError as e:
+            return jsonify({"error": str(e)}), 409
+        
+        if not booking:
+            return jsonify({"error": "Car not found"}), 404
+        
+        logger.info(f"Booking created: SOF{booking['id'][:8].upper()} for car {car_id} by {booking['client_email']}")
+        
+        # Send emails in the background - don't fail or delay the booking on email errors
+        email_service.send_booking_emails_async(booking)
+        
+        return jsonify({
+            "success": True,
+            "booking": booking,
+            "message": "Booking created successfully",
+            "next_steps": "Please proceed with payment confirmation"
+        }), 201
         
     except TooManyRequests as e:
         return jsonify({"error": str(e)}), 429
@@ -904,15 +899,15 @@ def contact_inquiry():
         # Validate and clean form data
         form_data = validate_contact_form_data(data)
         
-        # Send email
-        email_sent = email_service.send_contact_form_email(form_data)
+        # Queue email - sent (and retried) in the background
+        email_queued = email_service.send_contact_form_email_async(form_data)
         
-        if email_sent:
+        if email_queued:
             logger.info(f"Contact form submitted by {form_data['email']} from IP: {get_client_ip()}")
             return jsonify({
                 "success": True,
                 "message": "Your message has been sent successfully. We will get back to you soon!"
-            }), 200
+            }), 202
         else:
             logger.error(f"Failed to send contact form email from {form_data['email']}")
             return jsonify({
@@ -928,26 +923,38 @@ def contact_inquiry():
         logger.error(f"Error processing contact form: {e}")
         return jsonify({"error": "Failed to process contact form"}), 500
 
+# Last database probe made by /health, shared by probes within the TTL
+HEALTH_PROBE_TTL = 5
+_db_probe = {'checked_at': float('-inf'), 'error': None}
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Comprehensive health check endpoint"""
     health_data = {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now_iso(),
         "version": "1.2.0",
         "environment": os.environ.get('FLASK_ENV', 'development')
     }
     
     status_code = 200
     
-    # Test database connection
+    # Test database connection (probe result reused for HEALTH_PROBE_TTL seconds)
     if db_service:
-        try:
-            response = db_service.supabase.table('cars').select('id').limit(1).execute()
+        now = time.monotonic()
+        if now - _db_probe['checked_at'] >= HEALTH_PROBE_TTL:
+            try:
+                db_service.supabase.table('cars').select('id').limit(1).execute()
+                _db_probe['error'] = None
+            except Exception as e:
+                _db_probe['error'] = str(e)
+            _db_probe['checked_at'] = now
+        
+        if _db_probe['error'] is None:
             health_data['database'] = 'connected'
             health_data['database_response_time'] = 'fast'
-        except Exception as e:
-            health_data['database'] = f'error: {str(e)}'
+        else:
+            health_data['database'] = f"error: {_db_probe['error']}"
             health_data['status'] = 'degraded'
             status_code = 503
     else:
@@ -956,9 +963,8 @@ def health_check():
         status_code = 503
     
     # Test other components
-    from utils import rate_limit_storage, booking_locks
     health_data['rate_limiting'] = 'active' if rate_limit_storage is not None else 'inactive'
-    health_data['active_booking_locks'] = len(booking_locks)
+    health_data['rate_limit_backend'] = 'redis' if redis_client is not None else 'memory'
     health_data['rate_limit_entries'] = len(rate_limit_storage)
     health_data['admin_session'] = 'active' if session.get('admin_logged_in') else 'inactive'
     
@@ -971,7 +977,9 @@ def get_usage_overview():
         if not db_service:
             return jsonify({"error": "Database not available"}), 503
         
-        overview = get_usage_statistics()
+        # Logged-in admins can skip the 60 s cache with ?force=1
+        force = request.args.get('force') == '1' and bool(session.get('admin_logged_in'))
+        overview = get_usage_statistics(force)
         return jsonify(overview)
         
     except Exception as e:
@@ -979,18 +987,25 @@ def get_usage_overview():
         return jsonify({"error": "Failed to get usage overview"}), 500
 
 # Error handlers
+# Static error bodies, serialized once. A fresh Response is still built per
+# request because after_request hooks (CORS, compression) mutate its headers.
+_NOT_FOUND_BODY = orjson.dumps({'error': 'Endpoint not found'})
+_INTERNAL_ERROR_BODY = orjson.dumps({'error': 'Internal server error'})
+_RATE_LIMITED_BODY = orjson.dumps({'error': 'Rate limit exceeded', 'retry_after': '1 hour'})
+_UNAUTHORIZED_BODY = orjson.dumps({'error': 'Unauthorized access'})
+
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({'error': 'Endpoint not found'}), 404
+    return Response(_NOT_FOUND_BODY, 404, mimetype='application/json')
 
 @app.errorhandler(500)
 def internal_server_error(error):
     logger.error(f"Internal server error: {error}")
-    return jsonify({'error': 'Internal server error'}), 500
+    return Response(_INTERNAL_ERROR_BODY, 500, mimetype='application/json')
 
 @app.errorhandler(TooManyRequests)
 def handle_rate_limit_exceeded(error):
-    return jsonify({'error': 'Rate limit exceeded', 'retry_after': '1 hour'}), 429
+    return Response(_RATE_LIMITED_BODY, 429, mimetype='application/json')
 
 @app.errorhandler(BadRequest)
 def handle_bad_request(error):
@@ -998,7 +1013,7 @@ def handle_bad_request(error):
 
 @app.errorhandler(Unauthorized)
 def handle_unauthorized(error):
-    return jsonify({'error': 'Unauthorized access'}), 401
+    return Response(_UNAUTHORIZED_BODY, 401, mimetype='application/json')
 
 if __name__ == '__main__':
     # Development server
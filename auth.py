@@ -3,28 +3,42 @@ Authentication module for SofCar Flask API
 Handles admin authentication and session management
 """
 
+import hmac
+import time
+import hashlib
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from functools import wraps
 from flask import session, jsonify
+from werkzeug.security import check_password_hash
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Keyed digests of the admin credentials, computed once at startup
+_CREDENTIAL_KEY = hashlib.blake2b((Config.SECRET_KEY or '').encode()).digest()
+
+
+def _credential_digest(value: str) -> bytes:
+    """Keyed BLAKE2 digest used for constant-time credential comparison"""
+    return hashlib.blake2b(value.encode(), key=_CREDENTIAL_KEY).digest()
+
+
+_ADMIN_USERNAME_DIGEST = _credential_digest(Config.ADMIN_USERNAME)
+_ADMIN_PASSWORD_DIGEST = _credential_digest(Config.ADMIN_PASSWORD)
+
 
 def admin_required(f):
     """Decorator to require admin authentication"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'admin_logged_in' not in session or not session['admin_logged_in']:
+        if not session.get('admin_logged_in'):
             return jsonify({'error': 'Admin authentication required'}), 401
         
-        # Check session expiry
-        if 'admin_login_time' in session:
-            login_time = datetime.fromisoformat(session['admin_login_time'])
-            if datetime.now() - login_time > Config.PERMANENT_SESSION_LIFETIME:
-                session.clear()
-                return jsonify({'error': 'Session expired'}), 401
+        # Check session expiry (epoch seconds stored at login)
+        if time.time() > session.get('admin_expires_at', 0):
+            session.clear()
+            return jsonify({'error': 'Session expired'}), 401
         
         return f(*args, **kwargs)
     return decorated_function
@@ -33,11 +47,18 @@ def admin_required(f):
 def admin_login(username: str, password: str) -> dict:
     """Handle admin login"""
     try:
-        # Simple credential check
-        if username == Config.ADMIN_USERNAME and password == Config.ADMIN_PASSWORD:
+        # Constant-time credential check (both comparisons always run)
+        username_ok = hmac.compare_digest(_credential_digest(username), _ADMIN_USERNAME_DIGEST)
+        if Config.ADMIN_PASSWORD_HASH:
+            password_ok = check_password_hash(Config.ADMIN_PASSWORD_HASH, password)
+        else:
+            password_ok = hmac.compare_digest(_credential_digest(password), _ADMIN_PASSWORD_DIGEST)
+        
+        if username_ok & password_ok:
             session['admin_logged_in'] = True
             session['admin_username'] = username
             session['admin_login_time'] = datetime.now().isoformat()
+            session['admin_expires_at'] = time.time() + Config.PERMANENT_SESSION_LIFETIME.total_seconds()
             session.permanent = True
             
             logger.info(f"Admin login successful for {username}")
@@ -74,10 +95,8 @@ def get_admin_status() -> dict:
         }
     
     login_time = session.get('admin_login_time')
-    if login_time:
-        session_expires = (datetime.fromisoformat(login_time) + Config.PERMANENT_SESSION_LIFETIME).isoformat()
-    else:
-        session_expires = None
+    expires_at = session.get('admin_expires_at')
+    session_expires = datetime.fromtimestamp(expires_at).isoformat() if expires_at else None
     
     return {
         'logged_in': True,
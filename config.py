@@ -7,8 +7,11 @@ import os
 from datetime import timedelta
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Load environment variables (once per process tree - forked/re-spawned
+# workers inherit the environment and skip re-parsing .env)
+if os.environ.get('SOF_ENV_LOADED') != '1':
+    load_dotenv()
+    os.environ['SOF_ENV_LOADED'] = '1'
 
 
 class Config:
@@ -57,6 +60,8 @@ class Config:
     # Admin Configuration
     ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
     ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'change_this_password')
+    # Optional werkzeug password hash; when set it is used instead of ADMIN_PASSWORD
+    ADMIN_PASSWORD_HASH = os.environ.get('ADMIN_PASSWORD_HASH')
     
     # EmailJS Configuration
     EMAILJS_SERVICE_ID = os.environ.get('EMAILJS_SERVICE_ID')
@@ -68,12 +73,16 @@ class Config:
     # File Upload Configuration
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+    MAX_IMAGES_PER_UPLOAD = 10  # images are held in memory together, so this caps upload RAM at ~50MB
     SUPABASE_BUCKET = 'cars'
     
     # Rate Limiting Configuration
     RATE_LIMIT_WINDOW = 3600  # 1 hour
     RATE_LIMIT_MAX_REQUESTS = 5
     
+    # Redis Configuration (optional - shared rate limiting across workers)
+    REDIS_URL = os.environ.get('REDIS_URL')
+    
     # Security Configuration
     HONEYPOT_FIELDS = ['website', 'phone_number', 'company', 'subject', 'url', 'homepage']
     ALLOWED_PAYMENT_METHODS = ['vpos']
@@ -99,16 +108,13 @@ class Config:
     @classmethod
     def validate_required_config(cls):
         """Validate that all required configuration is present"""
-        required_vars = [
-            'SECRET_KEY',
-            'SUPABASE_URL', 
-            'SUPABASE_ANON_KEY'
-        ]
+        required_vars = (
+            ('SECRET_KEY', cls.SECRET_KEY),
+            ('SUPABASE_URL', cls.SUPABASE_URL),
+            ('SUPABASE_ANON_KEY', cls.SUPABASE_ANON_KEY)
+        )
         
-        missing_vars = []
-        for var in required_vars:
-            if not getattr(cls, var):
-                missing_vars.append(var)
+        missing_vars = [name for name, value in required_vars if not value]
         
         if missing_vars:
             raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
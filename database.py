@@ -3,14 +3,129 @@ Database service module for SofCar Flask API
 Handles all Supabase database operations
 """
 
+import atexit
 import logging
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
+import httpx
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
 from config import Config
+from utils import now_iso
 
 logger = logging.getLogger(__name__)
 
+# Postgres SQLSTATE raised by the bookings_no_overlap exclusion constraint
+EXCLUSION_VIOLATION = '23P01'
+
+
+class BookingConflictError(Exception):
+    """Raised when a booking overlaps an existing pending/confirmed booking"""
+
+
+# Keep-alive pool shared by each client's PostgREST and Storage sessions
+HTTP_POOL_LIMITS = httpx.Limits(max_keepalive_connections=50, max_connections=100, keepalive_expiry=300)
+HTTP_CONNECT_TIMEOUT = 3.0
+
+# Short-lived per-process cache of active car rows, keyed by car id
+CAR_CACHE_TTL = 60
+CAR_CACHE_MAX_SIZE = 512
+_car_cache: Dict[str, tuple] = {}
+_car_cache_lock = threading.Lock()
+
+# Public catalog lists, keyed by (include_inactive, car_class)
+CARS_LIST_CACHE_TTL = 30
+_cars_list_cache: Dict[tuple, tuple] = {}
+
+
+def invalidate_cached_car(car_id: str = None) -> None:
+    """Drop a car and the catalog lists from the lookup caches after a change"""
+    with _car_cache_lock:
+        if car_id:
+            _car_cache.pop(car_id, None)
+        _cars_list_cache.clear()
+
+# Runs independent queries side by side (httpx clients are thread-safe)
+_query_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='db-query')
+
+# One Supabase client per (url, key) per process
+_clients: Dict[tuple, Client] = {}
+_clients_lock = threading.Lock()
+
+
+def get_shared_client(url: str, key: str) -> Client:
+    """Get the process-wide Supabase client for the given credentials, creating it once"""
+    client = _clients.get((url, key))
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get((url, key))
+        if client is None:
+            client = create_client(url, key)
+            _configure_http_pool(client)
+            _clients[(url, key)] = client
+        return client
+
+
+@atexit.register
+def _close_shared_clients() -> None:
+    """Close pooled keep-alive connections when the worker exits"""
+    for client in _clients.values():
+        for session in (client.postgrest.session, client.storage.session):
+            try:
+                session.close()
+            except Exception:
+                pass
+
+
+class _RetryTransport(httpx.HTTPTransport):
+    """Transport that retries Supabase gateway blips with exponential backoff.
+    Reads are retried on 502/503/504; writes only on connection failures
+    (handled by httpx's own retries), since a gateway error doesn't tell us
+    whether the write was applied."""
+    
+    RETRY_STATUSES = frozenset({502, 503, 504})
+    RETRY_METHODS = frozenset({'GET', 'HEAD'})
+    MAX_ATTEMPTS = 3
+    BACKOFF_SECONDS = 0.2
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(self.MAX_ATTEMPTS):
+            response = super().handle_request(request)
+            if (response.status_code not in self.RETRY_STATUSES
+                    or request.method not in self.RETRY_METHODS
+                    or attempt + 1 == self.MAX_ATTEMPTS):
+                return response
+            response.close()
+            logger.warning(f"Supabase returned {response.status_code} for {request.method} {request.url.path}, retrying")
+            time.sleep(self.BACKOFF_SECONDS * 2 ** attempt)
+
+
+def _pooled_session(session: httpx.Client) -> httpx.Client:
+    """Rebuild an httpx session with the shared keep-alive pool limits and retries"""
+    pooled = session.__class__(
+        base_url=session.base_url,
+        headers=session.headers,
+        # Keep the library's read timeout but fail fast when Supabase can't be reached
+        timeout=httpx.Timeout(session.timeout.read, connect=HTTP_CONNECT_TIMEOUT),
+        transport=_RetryTransport(limits=HTTP_POOL_LIMITS, retries=2, http2=True)
+    )
+    session.close()
+    return pooled
+
+
+def _configure_http_pool(client: Client) -> None:
+    """Swap the default PostgREST and Storage sessions for pooled keep-alive sessions"""
+    postgrest = client.postgrest
+    postgrest.session = _pooled_session(postgrest.session)
+
+    # The storage client keeps the session under two names
+    storage = client.storage
+    storage.session = storage._client = _pooled_session(storage.session)
+
 
 class DatabaseService:
     """Service class for all database operations"""
@@ -23,14 +138,24 @@ class DatabaseService:
         
         # Initialize anon client
         try:
-            self.supabase: Client = create_client(url, anon_key)
+            self.supabase: Client = get_shared_client(url, anon_key)
             logger.info("Supabase anon client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Supabase anon client: {e}")
             self.supabase = None
         
-        # Admin client will be created on demand
+        # Create the admin client up front when a service key is configured, so
+        # get_admin_client is a plain attribute read on the request path.
+        # get_shared_client is lock-protected, so threads never build two clients.
         self._admin_client = None
+        if self._has_service_role_key():
+            try:
+                self.get_admin_client()
+            except Exception:
+                pass  # logged by get_admin_client; retried on first use
+    
+    def _has_service_role_key(self) -> bool:
+        return bool(self.service_role_key) and self.service_role_key != 'your_service_role_key_here'
     
     def get_admin_client(self) -> Client:
         """Get admin client with service role key to bypass RLS"""
@@ -38,10 +163,10 @@ class DatabaseService:
             return self._admin_client
             
         try:
-            if not self.service_role_key or self.service_role_key == 'your_service_role_key_here':
+            if not self._has_service_role_key():
                 raise Exception("Service role key not configured")
             
-            self._admin_client = create_client(self.url, self.service_role_key)
+            self._admin_client = get_shared_client(self.url, self.service_role_key)
             logger.info("Supabase admin client initialized successfully")
             return self._admin_client
         except Exception as e:
@@ -49,7 +174,14 @@ class DatabaseService:
             raise
     
     def get_cars(self, include_inactive: bool = False, car_class: str = None) -> List[Dict[str, Any]]:
-        """Get cars with optional filtering"""
+        """Get cars with optional filtering (cached for CARS_LIST_CACHE_TTL seconds)"""
+        key = (include_inactive, car_class)
+        now = time.monotonic()
+        with _car_cache_lock:
+            cached = _cars_list_cache.get(key)
+        if cached and cached[0] > now:
+            return list(cached[1])
+        
         try:
             query = self.supabase.table('cars').select('*')
             
@@ -60,16 +192,41 @@ class DatabaseService:
                 query = query.eq('class', car_class)
             
             response = query.order('brand').execute()
-            return response.data
+            with _car_cache_lock:
+                _cars_list_cache[key] = (now + CARS_LIST_CACHE_TTL, response.data)
+            return list(response.data)
         except Exception as e:
             logger.error(f"Error getting cars: {e}")
             raise
     
+    def get_car_class_counts(self) -> List[Dict[str, Any]]:
+        """Get active car counts per class from the pre-aggregated view"""
+        try:
+            response = self.supabase.table('car_class_counts').select('class, n').order('class').execute()
+            return response.data
+        except Exception as e:
+            logger.error(f"Error getting car class counts: {e}")
+            raise
+
     def get_car_by_id(self, car_id: str) -> Optional[Dict[str, Any]]:
-        """Get specific car by ID"""
+        """Get specific car by ID (cached for CAR_CACHE_TTL seconds)"""
+        now = time.monotonic()
+        with _car_cache_lock:
+            cached = _car_cache.get(car_id)
+        if cached and cached[0] > now:
+            return dict(cached[1])
+        
         try:
-            response = self.supabase.table('cars').select('*').eq('id', car_id).eq('is_active', True).execute()
-            return response.data[0] if response.data else None
+            # maybe_single() returns None (not a response) when nothing matched
+            response = self.supabase.table('cars').select('*').eq('id', car_id).eq('is_active', True).limit(1).maybe_single().execute()
+            car = response.data if response else None
+            if car:
+                with _car_cache_lock:
+                    if len(_car_cache) >= CAR_CACHE_MAX_SIZE:
+                        _car_cache.clear()
+                    _car_cache[car_id] = (now + CAR_CACHE_TTL, car)
+                return dict(car)
+            return None
         except Exception as e:
             logger.error(f"Error getting car {car_id}: {e}")
             raise
@@ -78,13 +235,15 @@ class DatabaseService:
         """Create new car"""
         try:
             # Set timestamps
-            car_data['created_at'] = datetime.now().isoformat()
-            car_data['updated_at'] = datetime.now().isoformat()
+            timestamp = now_iso()
+            car_data['created_at'] = timestamp
+            car_data['updated_at'] = timestamp
             
             response = self.get_admin_client().table('cars').insert(car_data).execute()
             if not response.data:
                 raise Exception("Failed to create car")
             
+            invalidate_cached_car()
             return response.data[0]
         except Exception as e:
             logger.error(f"Error creating car: {e}")
@@ -93,7 +252,7 @@ class DatabaseService:
     def update_car(self, car_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
         """Update existing car"""
         try:
-            update_data['updated_at'] = datetime.now().isoformat()
+            update_data['updated_at'] = now_iso()
             
             response = self.supabase.table('cars').update(update_data).eq('id', car_id).execute()
             if not response.data:
@@ -103,56 +262,69 @@ class DatabaseService:
         except Exception as e:
             logger.error(f"Error updating car {car_id}: {e}")
             raise
+        finally:
+            invalidate_cached_car(car_id)
     
-    def delete_car(self, car_id: str) -> bool:
-        """Delete car by ID"""
+    def delete_car(self, car_id: str) -> Optional[Dict[str, Any]]:
+        """Delete car by ID and return the deleted row, or None if no car matched"""
         try:
+            # PostgREST returns the deleted rows, which also confirms the delete
             response = self.get_admin_client().table('cars').delete().eq('id', car_id).execute()
-            
-            # Verify deletion
-            verify_response = self.get_admin_client().table('cars').select('id').eq('id', car_id).execute()
-            if verify_response.data:
-                raise Exception("Car still exists after delete operation")
-            
-            return True
+            return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error deleting car {car_id}: {e}")
             raise
+        finally:
+            invalidate_cached_car(car_id)
     
-    def check_car_availability(self, car_id: str, start_date: str, end_date: str) -> tuple[bool, Optional[str]]:
-        """Check if car is available for given date range"""
+    def get_car_availability(self, car_id: str, start_date: str, end_date: str) -> Optional[Dict[str, Any]]:
+        """Get active car, availability and pricing for a date range in one RPC call"""
         try:
-            logger.info(f"Checking availability for car {car_id} from {start_date} to {end_date}")
-            
-            # Check for overlapping confirmed bookings
-            query = self.supabase.table("bookings").select("id").eq("car_id", car_id).in_("status", ["confirmed", "pending"]).lte("start_date", end_date).gt("end_date", start_date).execute()
-            
-            logger.info(f"Overlap query result: {query.data}")
-            
-            if query.data:
-                logger.info(f"Car {car_id} is not available - has overlapping bookings")
-                return False, "Car is booked for overlapping dates"
-            
-            logger.info(f"Car {car_id} is available for the requested dates")
-            return True, None
+            response = self.supabase.rpc('car_availability', {
+                'p_car_id': car_id,
+                'p_start': start_date,
+                'p_end': end_date
+            }).execute()
+            return response.data[0] if response.data else None
         except Exception as e:
-            logger.error(f"Error checking availability: {e}")
-            return False, "Error checking availability"
-    
-    def create_booking(self, booking_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create new booking"""
+            logger.error(f"Error getting availability for car {car_id}: {e}")
+            raise
+
+    def get_unavailable_car_ids(self, car_ids: List[str], start_date: str, end_date: str) -> set:
+        """Get IDs of cars with overlapping bookings for the date range in a single query"""
+        if not car_ids:
+            return set()
+
         try:
-            response = self.supabase.table('bookings').insert(booking_data).execute()
-            if not response.data:
-                raise Exception(f"Failed to create booking: {response.error}")
-            
-            return response.data[0]
+            # Half-open [start, end) ranges, like the bookings_no_overlap constraint: a booking
+            # starting on the requested end date doesn't conflict. Served by bookings_car_status_dates_idx (sql/001)
+            query = self.supabase.table("bookings").select("car_id").in_("car_id", car_ids).in_("status", ["confirmed", "pending"]).lt("start_date", end_date).gt("end_date", start_date).execute()
+            return {booking['car_id'] for booking in query.data}
+        except Exception as e:
+            logger.error(f"Error checking availability for {len(car_ids)} cars: {e}")
+            raise
+
+    def create_booking_atomic(self, booking_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Price and insert a booking in one round-trip (create_booking_atomic RPC).
+        Returns the booking with its car embedded under 'cars', or None if the car
+        doesn't exist or is inactive."""
+        try:
+            response = self.supabase.rpc('create_booking_atomic', {'p_booking': booking_data}).execute()
+            return response.data
+        except APIError as e:
+            if e.code == EXCLUSION_VIOLATION:
+                logger.info(f"Booking rejected for car {booking_data.get('car_id')}: overlapping dates")
+                raise BookingConflictError("Car is booked for overlapping dates") from e
+            logger.error(f"Error creating booking: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error creating booking: {e}")
             raise
     
-    def get_bookings_filtered(self, filters: Dict[str, Any], limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
-        """Get bookings with filtering and pagination"""
+    def get_bookings_filtered(self, filters: Dict[str, Any], limit: int = 100, offset: int = 0,
+                              cursor: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Get bookings with filtering and pagination. With a cursor, the (created_at, id) of the
+        last row already seen (id may be None), the page is fetched by keyset instead of OFFSET."""
         try:
             query = self.get_admin_client().table('bookings').select('*, cars(brand, model, year, class)')
             
@@ -169,8 +341,20 @@ class DatabaseService:
             if filters.get('end_date'):
                 query = query.lte('end_date', filters['end_date'])
             
-            # Apply pagination and ordering
-            query = query.order('created_at', desc=True).limit(limit).offset(offset)
+            # Apply pagination and ordering; id breaks created_at ties so keyset pages never skip rows.
+            # postgrest-py has no multi-column order() or or_(), so these go into the query string directly.
+            query = query.limit(limit)
+            query.params = query.params.add('order', 'created_at.desc,id.desc')
+            if cursor:
+                created_at, booking_id = cursor
+                if booking_id:
+                    query.params = query.params.add(
+                        'or', f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{booking_id}))'
+                    )
+                else:
+                    query = query.lt('created_at', created_at)
+            elif offset:
+                query = query.offset(offset)
             
             response = query.execute()
             return response.data
@@ -178,33 +362,29 @@ class DatabaseService:
             logger.error(f"Error getting filtered bookings: {e}")
             raise
     
-    def update_booking(self, booking_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Update booking"""
+    def update_booking(self, booking_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update booking and return the updated row, or None if no booking matched"""
         try:
-            update_data['updated_at'] = datetime.now().isoformat()
+            update_data['updated_at'] = now_iso()
             
+            # PostgREST returns the updated rows, so no follow-up select is needed
             response = self.get_admin_client().table('bookings').update(update_data).eq('id', booking_id).execute()
-            if not response.data:
-                raise Exception("Failed to update booking")
-            
-            return response.data[0]
+            return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error updating booking {booking_id}: {e}")
             raise
     
-    def soft_delete_booking(self, booking_id: str) -> Dict[str, Any]:
-        """Soft delete booking by setting status to 'deleted'"""
+    def soft_delete_booking(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        """Soft delete booking by setting status to 'deleted'.
+        Returns None if the booking doesn't exist or is already deleted."""
         try:
             update_data = {
                 'status': 'deleted',
-                'updated_at': datetime.now().isoformat()
+                'updated_at': now_iso()
             }
             
-            response = self.get_admin_client().table('bookings').update(update_data).eq('id', booking_id).execute()
-            if not response.data:
-                raise Exception("Failed to delete booking")
-            
-            return response.data[0]
+            response = self.get_admin_client().table('bookings').update(update_data).eq('id', booking_id).neq('status', 'deleted').execute()
+            return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error soft deleting booking {booking_id}: {e}")
             raise
@@ -212,8 +392,8 @@ class DatabaseService:
     def get_booking_by_id(self, booking_id: int) -> Optional[Dict[str, Any]]:
         """Get booking by ID"""
         try:
-            response = self.supabase.table('bookings').select('*, cars(brand, model, year, class)').eq('id', booking_id).execute()
-            return response.data[0] if response.data else None
+            response = self.supabase.table('bookings').select('*, cars(brand, model, year, class)').eq('id', booking_id).limit(1).maybe_single().execute()
+            return response.data if response else None
         except Exception as e:
             logger.error(f"Error getting booking {booking_id}: {e}")
             raise
@@ -221,58 +401,64 @@ class DatabaseService:
     def get_booking_by_reference(self, booking_reference: str) -> Optional[Dict[str, Any]]:
         """Get booking by reference number"""
         try:
-            response = self.supabase.table('bookings').select('*, cars(brand, model, year, class)').eq('booking_reference', booking_reference).execute()
-            return response.data[0] if response.data else None
+            response = self.supabase.table('bookings').select('*, cars(brand, model, year, class)').eq('booking_reference', booking_reference).limit(1).maybe_single().execute()
+            return response.data if response else None
         except Exception as e:
             logger.error(f"Error getting booking {booking_reference}: {e}")
             raise
     
     def get_booking_statistics(self, filters: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Get booking statistics"""
+        """Get booking statistics (aggregated by the booking_stats RPC)"""
         try:
-            query = self.get_admin_client().table('bookings').select('status, total_price')
-            
-            if filters:
-                if filters.get('start_date'):
-                    query = query.gte('start_date', filters['start_date'])
-                if filters.get('end_date'):
-                    query = query.lte('end_date', filters['end_date'])
-            
-            response = query.execute()
-            bookings = response.data
-            
-            # Calculate statistics
-            total_bookings = len(bookings)
-            pending_bookings = len([b for b in bookings if b['status'] == 'pending'])
-            confirmed_bookings = len([b for b in bookings if b['status'] == 'confirmed'])
-            cancelled_bookings = len([b for b in bookings if b['status'] == 'cancelled'])
-            total_revenue = sum([float(b['total_price'] or 0) for b in bookings if b['status'] == 'confirmed'])
+            filters = filters or {}
+            response = self.get_admin_client().rpc('booking_stats', {
+                'p_start': filters.get('start_date'),
+                'p_end': filters.get('end_date')
+            }).execute()
+            row = response.data[0]
             
             return {
-                'total': total_bookings,
-                'pending': pending_bookings,
-                'confirmed': confirmed_bookings,
-                'cancelled': cancelled_bookings,
-                'total_revenue': total_revenue
+                'total': row['total'],
+                'pending': row['pending'],
+                'confirmed': row['confirmed'],
+                'cancelled': row['cancelled'],
+                'total_revenue': float(row['total_revenue'] or 0)
             }
         except Exception as e:
             logger.error(f"Error getting booking statistics: {e}")
             raise
     
-    def get_car_statistics(self) -> Dict[str, Any]:
-        """Get car statistics"""
+    def get_usage_counts(self) -> Dict[str, int]:
+        """Get total car and booking row counts (usage_counts RPC)"""
         try:
-            response = self.get_admin_client().table('cars').select('*').execute()
-            cars = response.data
-            
-            total_cars = len(cars)
-            active_cars = len([car for car in cars if car.get('is_active', True)])
+            row = self.get_admin_client().rpc('usage_counts').execute().data[0]
+            return {'cars': row['cars'], 'bookings': row['bookings']}
+        except Exception as e:
+            logger.error(f"Error getting usage counts: {e}")
+            raise
+    
+    def get_bookings_with_statistics(self, filters: Dict[str, Any], limit: int = 100, offset: int = 0,
+                                     cursor: Optional[tuple] = None) -> tuple:
+        """Fetch a page of bookings and the booking statistics concurrently"""
+        stats_future = _query_pool.submit(self.get_booking_statistics, filters)
+        bookings = self.get_bookings_filtered(filters, limit, offset, cursor)
+        return bookings, stats_future.result()
+    
+    def get_admin_cars_with_stats(self) -> Dict[str, Any]:
+        """Get all cars (newest first) and their statistics in one RPC call"""
+        try:
+            result = self.get_admin_client().rpc('admin_cars_with_stats', {}).execute().data
+            total_cars = result['total']
+            active_cars = result['active']
             
             return {
-                'total': total_cars,
-                'active': active_cars,
-                'inactive': total_cars - active_cars
+                'cars': result['cars'],
+                'statistics': {
+                    'total': total_cars,
+                    'active': active_cars,
+                    'inactive': total_cars - active_cars
+                }
             }
         except Exception as e:
-            logger.error(f"Error getting car statistics: {e}")
+            logger.error(f"Error getting cars with statistics: {e}")
             raise
@@ -3,13 +3,48 @@ Email service module for SofCar Flask API
 Handles all email operations using EmailJS
 """
 
+import time
 import logging
+import orjson
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from requests.adapters import HTTPAdapter
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+EMAILJS_SEND_URL = "https://api.emailjs.com/api/v1.0/email/send"
+# (connect, read) seconds - fail fast on network stalls, retries happen in _send_with_retry
+EMAILJS_TIMEOUT = (3, 10)
+EMAILJS_HEADERS = {'Content-Type': 'application/json'}
+
+# Shared keep-alive session so repeated sends skip the TLS handshake
+_http_session = requests.Session()
+_http_session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+# Booking emails are sent off the request path, retried with exponential backoff
+_email_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='email')
+EMAIL_MAX_ATTEMPTS = 3
+
+# Fixed EUR/BGN peg of 1.95583, as a reciprocal so conversions multiply
+BGN_TO_EUR = 1 / 1.95583
+
+
+def _rental_days(booking_data: dict) -> int:
+    """Rental days for a booking, parsing the date range only if the row lacks it"""
+    if booking_data.get('rental_days') is not None:
+        return booking_data['rental_days']
+    start_date = date.fromisoformat(booking_data['start_date'])
+    end_date = date.fromisoformat(booking_data['end_date'])
+    return (end_date - start_date).days
+
+
+def _fmt_bgn_eur(bgn: float) -> str:
+    """Format a BGN amount (prices are stored in BGN) with its EUR equivalent"""
+    eur = round(bgn * BGN_TO_EUR, 2)
+    return f"{bgn:.2f} лв / ≈{eur:.2f} €"
+
 
 class EmailService:
     """Service class for all email operations"""
@@ -21,12 +56,14 @@ class EmailService:
         self.private_key = Config.EMAILJS_PRIVATE_KEY
         self.contact_template_id = Config.EMAILJS_CONTACT_TEMPLATE_ID
         self.booking_template_id = Config.EMAILJS_BOOKING_TEMPLATE_ID
+        
+        # Which templates can be sent, resolved once
+        self._booking_ready = bool(self.service_id and self.booking_template_id and self.public_key)
+        self._contact_ready = bool(self.service_id and self.contact_template_id and self.public_key)
     
     def send_emailjs_email(self, service_id: str, template_id: str, template_params: dict, public_key: str, private_key: str = None) -> bool:
         """Send email using EmailJS API"""
         try:
-            url = "https://api.emailjs.com/api/v1.0/email/send"
-            
             data = {
                 "service_id": service_id,
                 "template_id": template_id,
@@ -38,7 +75,7 @@ class EmailService:
             if private_key:
                 data["accessToken"] = private_key
             
-            response = requests.post(url, json=data, timeout=30)
+            response = _http_session.post(EMAILJS_SEND_URL, data=orjson.dumps(data), headers=EMAILJS_HEADERS, timeout=EMAILJS_TIMEOUT)
             
             if response.status_code == 200:
                 logger.info(f"Email sent successfully via EmailJS")
@@ -51,31 +88,23 @@ class EmailService:
             logger.error(f"Error sending email via EmailJS: {e}")
             return False
     
-    def send_booking_confirmation_email(self, booking_data: dict, car_data: dict) -> bool:
-        """Send booking confirmation email to client"""
-        if not all([self.service_id, self.booking_template_id, self.public_key]):
+    def send_booking_confirmation_email(self, booking_data: dict) -> bool:
+        """Send booking confirmation email to client; booking_data carries its car under 'cars'"""
+        if not self._booking_ready:
             logger.warning("EmailJS not configured for booking confirmations")
             return False
         
-        # Calculate rental days
-        start_date = datetime.strptime(booking_data['start_date'], '%Y-%m-%d').date()
-        end_date = datetime.strptime(booking_data['end_date'], '%Y-%m-%d').date()
-        rental_days = (end_date - start_date).days
-        
-        # Calculate BGN values (assuming prices are stored in BGN)
-        total_price_bgn = booking_data['total_price']
-        deposit_amount_bgn = booking_data['deposit_amount']
-        
-        # Calculate EUR equivalents (approximate conversion rate 1.96)
-        total_price_eur = round(total_price_bgn / 1.96, 2)
-        deposit_amount_eur = round(deposit_amount_bgn / 1.96, 2)
+        car_data = booking_data['cars']
+        rental_days = _rental_days(booking_data)
+        full_name = f"{booking_data['client_first_name']} {booking_data['client_last_name']}"
+        email = booking_data['client_email']
         
         template_params = {
-            "name": f"{booking_data['client_first_name']} {booking_data['client_last_name']}",
-            "email": booking_data['client_email'],
+            "name": full_name,
+            "email": email,
             "phone": booking_data['client_phone'],
-            "client_name": f"{booking_data['client_first_name']} {booking_data['client_last_name']}",
-            "client_email": booking_data['client_email'],
+            "client_name": full_name,
+            "client_email": email,
             "booking_reference": f"SOF{booking_data['id'][:8].upper()}",  # Use booking ID as reference
             "car_brand": car_data['brand'],
             "car_model": car_data['model'],
@@ -83,8 +112,8 @@ class EmailService:
             "start_date": booking_data['start_date'],
             "end_date": booking_data['end_date'],
             "rental_days": rental_days,
-            "total_price": f"{total_price_bgn:.2f} лв / ≈{total_price_eur:.2f} €",
-            "deposit_amount": f"{deposit_amount_bgn:.2f} лв / ≈{deposit_amount_eur:.2f} €",
+            "total_price": _fmt_bgn_eur(booking_data['total_price']),
+            "deposit_amount": _fmt_bgn_eur(booking_data['deposit_amount']),
             "payment_method": booking_data['payment_method']
         }
         
@@ -96,16 +125,14 @@ class EmailService:
             self.private_key
         )
     
-    def send_admin_notification_email(self, booking_data: dict, car_data: dict) -> bool:
+    def send_admin_notification_email(self, booking_data: dict) -> bool:
         """Send admin notification email for new booking using contact template"""
-        if not all([self.service_id, self.contact_template_id, self.public_key]):
+        if not self._contact_ready:
             logger.warning("EmailJS not configured for admin notifications")
             return False
         
-        # Calculate rental days
-        start_date = datetime.strptime(booking_data['start_date'], '%Y-%m-%d').date()
-        end_date = datetime.strptime(booking_data['end_date'], '%Y-%m-%d').date()
-        rental_days = (end_date - start_date).days
+        car_data = booking_data['cars']
+        rental_days = _rental_days(booking_data)
         
         # Format the message for admin notification
         admin_message = f"""🚗 НОВА РЕЗЕРВАЦИЯ!
@@ -137,9 +164,46 @@ ID: {booking_data['id']}
             self.private_key
         )
     
+    @staticmethod
+    def _send_with_retry(send, description: str, *args) -> bool:
+        """Call an email sender, retrying failures with exponential backoff"""
+        for attempt in range(EMAIL_MAX_ATTEMPTS):
+            try:
+                if send(*args):
+                    return True
+            except Exception as e:
+                logger.error(f"Error sending {description}: {e}")
+            if attempt + 1 < EMAIL_MAX_ATTEMPTS:
+                time.sleep(2 ** attempt)
+        logger.error(f"Giving up on {description} after {EMAIL_MAX_ATTEMPTS} attempts")
+        return False
+    
+    def send_booking_emails_async(self, booking_data: dict) -> None:
+        """Queue the client confirmation and admin notification as two concurrent
+        background jobs and return immediately"""
+        reference = f"SOF{booking_data['id'][:8].upper()}"
+        if not self._booking_ready:
+            logger.warning(f"EmailJS not configured for booking confirmations, skipping for {reference}")
+        else:
+            _email_pool.submit(self._send_with_retry, self.send_booking_confirmation_email,
+                               f"confirmation for booking {reference}", booking_data)
+        if not self._contact_ready:
+            logger.warning(f"EmailJS not configured for admin notifications, skipping for {reference}")
+        else:
+            _email_pool.submit(self._send_with_retry, self.send_admin_notification_email,
+                               f"admin notification for booking {reference}", booking_data)
+    
+    def send_contact_form_email_async(self, form_data: dict) -> bool:
+        """Queue a contact form email; returns False if EmailJS isn't configured for it"""
+        if not self._contact_ready:
+            logger.warning("EmailJS not configured for contact form")
+            return False
+        _email_pool.submit(self._send_with_retry, self.send_contact_form_email, f"contact form email from {form_data['email']}", form_data)
+        return True
+    
     def send_contact_form_email(self, form_data: dict) -> bool:
         """Send contact form email"""
-        if not all([self.service_id, self.contact_template_id, self.public_key]):
+        if not self._contact_ready:
             logger.warning("EmailJS not configured for contact form")
             return False
         
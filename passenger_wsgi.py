@@ -5,35 +5,38 @@ Passenger WSGI configuration for cPanel deployment
 import sys
 import os
 
-# Add the current directory to the Python path
-sys.path.insert(0, os.path.dirname(__file__))
+# Add the current directory to the Python path (once - Passenger may re-import this module)
+APP_DIR = os.path.dirname(__file__)
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
 
-# Import the Flask application
-from app import app as application
+# Import the Flask application; config validation and client setup run once at app import.
+# Errors go to stderr, which lands in the Passenger error log.
+try:
+    from app import app as application
+except Exception as e:
+    print(f"Error creating application: {e}", file=sys.stderr)
+    raise
 
 # Ensure we're using the right Python version
 if __name__ == '__main__':
-    print(f"Python version: {sys.version}")
-    print(f"Python executable: {sys.executable}")
-    print(f"Current working directory: {os.getcwd()}")
-    print(f"Python path: {sys.path[:3]}...")  # Show first 3 paths
+    print(f"Python version: {sys.version}", file=sys.stderr)
+    print(f"Python executable: {sys.executable}", file=sys.stderr)
+    print(f"Current working directory: {os.getcwd()}", file=sys.stderr)
+    print(f"Python path: {sys.path[:3]}...", file=sys.stderr)  # Show first 3 paths
     
     # Test import
     try:
         import flask
-        print(f"Flask version: {flask.__version__}")
+        print(f"Flask version: {flask.__version__}", file=sys.stderr)
     except ImportError:
-        print("Flask not installed!")
+        print("Flask not installed!", file=sys.stderr)
     
     try:
         import supabase
-        print("Supabase client available")
+        print("Supabase client available", file=sys.stderr)
     except ImportError:
-        print("Supabase not installed!")
+        print("Supabase not installed!", file=sys.stderr)
     
-    # Test app creation
-    try:
-        print(f"Application: {application}")
-        print("WSGI application ready!")
-    except Exception as e:
-        print(f"Error creating application: {e}")
\ No newline at end of file
+    print(f"Application: {application}", file=sys.stderr)
+    print("WSGI application ready!", file=sys.stderr)
@@ -0,0 +1,14 @@
+-- Indexes for the hot public read paths.
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block:
+-- run each statement on its own in the Supabase SQL editor.
+
+-- GET /cars: is_active = true, optional class filter, ordered by brand
+CREATE INDEX CONCURRENTLY IF NOT EXISTS cars_active_class_brand_idx
+    ON public.cars (class, brand)
+    WHERE is_active = true;
+
+-- Availability checks (DatabaseService.get_unavailable_car_ids) and the
+-- booking guard in admin_delete_car
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bookings_car_status_dates_idx
+    ON public.bookings (car_id, status, start_date, end_date)
+    WHERE status IN ('pending', 'confirmed');
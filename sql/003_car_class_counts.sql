@@ -0,0 +1,32 @@
+-- Pre-aggregated active car counts per class for GET /cars/classes.
+-- Refreshed by a statement-level trigger on every cars mutation.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.car_class_counts AS
+    SELECT class, count(*) AS n
+    FROM public.cars
+    WHERE is_active
+    GROUP BY class;
+
+-- Required for REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS car_class_counts_class_idx
+    ON public.car_class_counts (class);
+
+GRANT SELECT ON public.car_class_counts TO anon, authenticated;
+
+CREATE OR REPLACE FUNCTION public.refresh_car_class_counts()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY public.car_class_counts;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS cars_refresh_class_counts ON public.cars;
+CREATE TRIGGER cars_refresh_class_counts
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.cars
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.refresh_car_class_counts();
@@ -0,0 +1,18 @@
+-- Admin cars list and counts in one query for GET /admin/cars.
+
+CREATE OR REPLACE FUNCTION public.admin_cars_with_stats()
+RETURNS json
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'cars', coalesce(json_agg(c ORDER BY c.created_at DESC), '[]'::json),
+        'total', count(*),
+        'active', count(*) FILTER (WHERE c.is_active)
+    )
+    FROM public.cars c
+$$;
+
+-- Only the service role (admin client) may call it
+REVOKE EXECUTE ON FUNCTION public.admin_cars_with_stats() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.admin_cars_with_stats() TO service_role;
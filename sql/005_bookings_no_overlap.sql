@@ -0,0 +1,14 @@
+-- Reject overlapping pending/confirmed bookings for the same car atomically.
+-- Inserts that collide fail with SQLSTATE 23P01 (exclusion_violation), which
+-- DatabaseService.create_booking_atomic maps to BookingConflictError (HTTP 409).
+-- Existing overlapping rows must be resolved before this constraint can be added.
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE public.bookings
+    ADD CONSTRAINT bookings_no_overlap
+    EXCLUDE USING gist (
+        car_id WITH =,
+        daterange(start_date, end_date, '[)') WITH &&
+    )
+    WHERE (status IN ('pending', 'confirmed'));
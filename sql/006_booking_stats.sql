@@ -0,0 +1,22 @@
+-- Booking counts and confirmed revenue for GET /admin/bookings, aggregated in
+-- Postgres instead of shipping every (status, total_price) row to the API.
+-- NULL bounds mean "no filter", matching the optional start_date/end_date params.
+
+CREATE OR REPLACE FUNCTION public.booking_stats(p_start date DEFAULT NULL, p_end date DEFAULT NULL)
+RETURNS TABLE (total bigint, pending bigint, confirmed bigint, cancelled bigint, total_revenue numeric)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT count(*),
+           count(*) FILTER (WHERE status = 'pending'),
+           count(*) FILTER (WHERE status = 'confirmed'),
+           count(*) FILTER (WHERE status = 'cancelled'),
+           coalesce(sum(total_price) FILTER (WHERE status = 'confirmed'), 0)
+    FROM public.bookings
+    WHERE (p_start IS NULL OR start_date >= p_start)
+      AND (p_end IS NULL OR end_date <= p_end)
+$$;
+
+-- Only the service role (admin client) may call it
+REVOKE EXECUTE ON FUNCTION public.booking_stats(date, date) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.booking_stats(date, date) TO service_role;
@@ -0,0 +1,47 @@
+-- Look up the car, price the booking and insert it in one round-trip for
+-- POST /bookings. total_price and deposit_amount come from the current car
+-- row, not from the API's cached copy. Overlaps are still rejected by the
+-- bookings_no_overlap constraint (SQLSTATE 23P01 -> HTTP 409).
+-- Returns the new booking with the car embedded as "cars" (same shape as the
+-- PostgREST cars(...) embed), or NULL if the car doesn't exist or is inactive.
+
+CREATE OR REPLACE FUNCTION public.create_booking_atomic(p_booking jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_car public.cars%ROWTYPE;
+    v_days integer;
+    v_booking public.bookings%ROWTYPE;
+BEGIN
+    SELECT * INTO v_car
+    FROM public.cars
+    WHERE id = (p_booking->>'car_id')::uuid AND is_active;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    v_days := (p_booking->>'end_date')::date - (p_booking->>'start_date')::date;
+
+    INSERT INTO public.bookings (
+        car_id, start_date, end_date, rental_days,
+        client_last_name, client_first_name, client_email, client_phone,
+        total_price, status, payment_method, deposit_amount, deposit_status,
+        ip_address, notes, created_at
+    )
+    SELECT r.car_id, r.start_date, r.end_date, v_days,
+           r.client_last_name, r.client_first_name, r.client_email, r.client_phone,
+           v_car.price_per_day * v_days, r.status, r.payment_method, v_car.deposit_amount, r.deposit_status,
+           r.ip_address, r.notes, r.created_at
+    FROM jsonb_populate_record(NULL::public.bookings, p_booking) r
+    RETURNING * INTO v_booking;
+
+    RETURN to_jsonb(v_booking) || jsonb_build_object('cars', jsonb_build_object(
+        'brand', v_car.brand,
+        'model', v_car.model,
+        'year', v_car.year,
+        'class', v_car.class
+    ));
+END;
+$$;
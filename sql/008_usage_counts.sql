@@ -0,0 +1,15 @@
+-- Row counts for the admin usage overview (utils.get_usage_statistics),
+-- fetched in one round-trip instead of two count=exact selects.
+
+CREATE OR REPLACE FUNCTION public.usage_counts()
+RETURNS TABLE (cars bigint, bookings bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT (SELECT count(*) FROM public.cars),
+           (SELECT count(*) FROM public.bookings)
+$$;
+
+-- Only the service role (admin client) may call it
+REVOKE EXECUTE ON FUNCTION public.usage_counts() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.usage_counts() TO service_role;
@@ -0,0 +1,37 @@
+-- Redefine car_availability with the half-open [start, end) overlap rule used by
+-- the bookings_no_overlap constraint (sql/005), so a car whose next booking starts
+-- on the requested end date is reported available, as POST /bookings would accept it.
+-- Overlap rule matches DatabaseService.get_unavailable_car_ids.
+
+CREATE OR REPLACE FUNCTION public.car_availability(p_car_id uuid, p_start date, p_end date)
+RETURNS TABLE (
+    car jsonb,
+    is_available boolean,
+    reason text,
+    total_price numeric,
+    rental_days integer
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH c AS (
+        SELECT * FROM public.cars WHERE id = p_car_id AND is_active
+    ),
+    conflict AS (
+        SELECT EXISTS (
+            SELECT 1
+            FROM public.bookings
+            WHERE car_id = p_car_id
+              AND status IN ('pending', 'confirmed')
+              AND start_date < p_end
+              AND end_date > p_start
+        ) AS found
+    )
+    SELECT
+        to_jsonb(c.*),
+        NOT conflict.found,
+        CASE WHEN conflict.found THEN 'Car is booked for overlapping dates' END,
+        c.price_per_day * (p_end - p_start),
+        p_end - p_start
+    FROM c, conflict
+$$;
@@ -0,0 +1,9 @@
+-- Only refresh car_class_counts (sql/003) when a write can change it. The view
+-- counts active cars per class, so updates that touch neither class nor is_active
+-- (prices, descriptions, image URLs) no longer trigger a full concurrent refresh.
+
+DROP TRIGGER IF EXISTS cars_refresh_class_counts ON public.cars;
+CREATE TRIGGER cars_refresh_class_counts
+    AFTER INSERT OR DELETE OR TRUNCATE OR UPDATE OF class, is_active ON public.cars
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.refresh_car_class_counts();
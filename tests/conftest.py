@@ -0,0 +1,27 @@
+"""
+Shared test setup: import the app modules from the repo root with dummy credentials
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ.setdefault('SUPABASE_URL', 'https://example.supabase.co')
+os.environ.setdefault('SUPABASE_ANON_KEY', 'test-anon-key')
+
+
+@pytest.fixture
+def admin_client(monkeypatch):
+    """Test client with a live admin session and rate limiting off"""
+    import app as app_module
+
+    monkeypatch.setattr(app_module, 'check_rate_limit', lambda: None)
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+        session['admin_expires_at'] = time.time() + 3600
+    return client
@@ -0,0 +1,93 @@
+"""
+Tests for the admin bookings keyset cursor
+"""
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('supabase')
+
+import httpx
+from postgrest import SyncPostgrestClient
+
+import app as app_module
+from database import DatabaseService
+
+BOOKING_ID = '123e4567-e89b-12d3-a456-426614174000'
+
+
+class _Bookings:
+    """Stands in for db_service and records the cursor each page was requested with"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.cursors = []
+
+    def get_bookings_with_statistics(self, filters, limit, offset, cursor):
+        self.cursors.append(cursor)
+        return self.rows[:limit], {}
+
+
+@pytest.mark.parametrize('created_at, expected', [
+    ('2030-01-02T10:00:00.123456+00:00', '2030-01-02T10:00:00.123456Z'),
+    ('2030-01-02 10:00:00.5+00', '2030-01-02T10:00:00.500000Z'),
+    ('2030-01-02T12:00:00+02:00', '2030-01-02T10:00:00.000000Z'),
+    ('2030-01-02T10:00:00', '2030-01-02T10:00:00.000000Z'),
+])
+def test_next_cursor_round_trips_as_utc(monkeypatch, admin_client, created_at, expected):
+    bookings = _Bookings([{'id': BOOKING_ID, 'created_at': created_at}])
+    monkeypatch.setattr(app_module, 'db_service', bookings)
+
+    cursor = admin_client.get('/admin/bookings?limit=1').get_json()['pagination']['next_cursor']
+    assert cursor == {'before_created_at': expected, 'before_id': BOOKING_ID}
+
+    response = admin_client.get('/admin/bookings', query_string={'limit': 1, **cursor})
+    assert response.status_code == 200
+    assert bookings.cursors == [None, (expected, BOOKING_ID)]
+
+
+def test_last_page_has_no_cursor(monkeypatch, admin_client):
+    monkeypatch.setattr(app_module, 'db_service', _Bookings([{'id': BOOKING_ID, 'created_at': '2030-01-02T10:00:00Z'}]))
+
+    response = admin_client.get('/admin/bookings?limit=2')
+
+    assert response.get_json()['pagination']['next_cursor'] is None
+
+
+@pytest.mark.parametrize('query', [
+    'before_created_at=yesterday',
+    'before_created_at=2030-01-02T10:00:00 00:00',
+    'before_created_at=2030-13-02T10:00:00Z',
+    'before_created_at=2030-01-02T10:00:00Z&before_id=42',
+])
+def test_invalid_cursor_returns_400(monkeypatch, admin_client, query):
+    bookings = _Bookings([])
+    monkeypatch.setattr(app_module, 'db_service', bookings)
+
+    response = admin_client.get(f'/admin/bookings?{query}')
+
+    assert response.status_code == 400
+    assert bookings.cursors == []
+
+
+def test_cursor_breaks_created_at_ties_by_id():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=[])
+
+    client = SyncPostgrestClient('https://example.supabase.co/rest/v1')
+    client.session = httpx.Client(base_url='https://example.supabase.co/rest/v1', transport=httpx.MockTransport(handler))
+    db_service = DatabaseService.__new__(DatabaseService)
+    db_service._admin_client = client
+
+    db_service.get_bookings_filtered({}, 50, 0, ('2030-01-02T10:00:00.000000Z', BOOKING_ID))
+
+    params = requests[0].url.params
+    assert params['order'] == 'created_at.desc,id.desc'
+    assert params['or'] == (
+        '(created_at.lt."2030-01-02T10:00:00.000000Z",'
+        f'and(created_at.eq."2030-01-02T10:00:00.000000Z",id.lt.{BOOKING_ID}))'
+    )
+    assert 'offset' not in params
@@ -0,0 +1,62 @@
+"""
+Tests for POST /bookings error mapping
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('supabase')
+
+from postgrest.exceptions import APIError
+
+import app as app_module
+from database import DatabaseService
+
+
+class _FailingRpc:
+    def __init__(self, error):
+        self.error = error
+
+    def rpc(self, name, params):
+        return self
+
+    def execute(self):
+        raise self.error
+
+
+def _booking_payload():
+    start = date.today() + timedelta(days=7)
+    return {
+        'car_id': '123e4567-e89b-12d3-a456-426614174000',
+        'start_date': start.isoformat(),
+        'end_date': (start + timedelta(days=5)).isoformat(),
+        'client_last_name': 'Ivanov',
+        'client_first_name': 'Ivan',
+        'client_email': 'ivan@example.com',
+        'client_phone': '+359888123456',
+        'payment_method': 'vpos'
+    }
+
+
+def _post_booking(monkeypatch, error):
+    db_service = DatabaseService.__new__(DatabaseService)
+    db_service.supabase = _FailingRpc(error)
+    monkeypatch.setattr(app_module, 'db_service', db_service)
+    monkeypatch.setattr(app_module, 'check_rate_limit', lambda: None)
+    return app_module.app.test_client().post('/bookings', json=_booking_payload())
+
+
+def test_overlapping_booking_returns_409(monkeypatch):
+    response = _post_booking(monkeypatch, APIError({'code': '23P01', 'message': 'conflicting key value violates exclusion constraint'}))
+
+    assert response.status_code == 409
+    assert response.get_json() == {'error': 'Car is booked for overlapping dates'}
+
+
+def test_other_database_errors_return_500(monkeypatch):
+    response = _post_booking(monkeypatch, APIError({'code': '42501', 'message': 'permission denied'}))
+
+    assert response.status_code == 500
+    assert 'BookingConflictError' not in response.get_data(as_text=True)
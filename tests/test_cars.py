@@ -0,0 +1,53 @@
+"""
+Tests for GET /cars availability filtering
+"""
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('supabase')
+
+import app as app_module
+import database
+from database import DatabaseService
+
+
+class _Query:
+    """Chainable stand-in for a PostgREST query that honours limit()"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.row_limit = None
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def execute(self):
+        rows = self.rows if self.row_limit is None else self.rows[:self.row_limit]
+        return type('Response', (), {'data': rows})()
+
+
+class _Supabase:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def table(self, name):
+        return _Query(self.tables[name])
+
+
+def test_cars_with_overlapping_bookings_are_all_hidden(monkeypatch):
+    cars = [{'id': 'car-1', 'brand': 'Audi'}, {'id': 'car-2', 'brand': 'BMW'}, {'id': 'car-3', 'brand': 'Skoda'}]
+    bookings = [{'car_id': 'car-1'}, {'car_id': 'car-2'}]
+    db_service = DatabaseService.__new__(DatabaseService)
+    db_service.supabase = _Supabase({'cars': cars, 'bookings': bookings})
+    monkeypatch.setattr(app_module, 'db_service', db_service)
+    monkeypatch.setattr(database, '_cars_list_cache', {})
+
+    response = app_module.app.test_client().get('/cars?start_date=2030-06-01&end_date=2030-06-05')
+
+    assert response.status_code == 200
+    assert [car['id'] for car in response.get_json()['cars']] == ['car-3']
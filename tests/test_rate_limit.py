@@ -0,0 +1,102 @@
+"""
+Tests for the in-memory token bucket rate limiter
+"""
+
+from collections import OrderedDict
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('redis')
+
+from flask import Flask
+from werkzeug.exceptions import TooManyRequests
+
+import utils
+from config import Config
+
+REFILL_INTERVAL = Config.RATE_LIMIT_WINDOW / Config.RATE_LIMIT_MAX_REQUESTS
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(utils.time, 'monotonic', clock)
+    monkeypatch.setattr(utils, 'redis_client', None)
+    monkeypatch.setattr(utils, 'rate_limit_storage', OrderedDict())
+    monkeypatch.setattr(utils, '_next_rate_limit_purge', 0.0)
+    return clock
+
+
+def _request_from(ip):
+    """Run check_rate_limit as a request from ip; True if it was allowed"""
+    with Flask(__name__).test_request_context(environ_base={'REMOTE_ADDR': ip}):
+        try:
+            utils.check_rate_limit()
+        except TooManyRequests:
+            return False
+        return True
+
+
+def test_bucket_empties_then_refills_one_token_per_interval(clock):
+    assert [_request_from('10.0.0.1') for _ in range(Config.RATE_LIMIT_MAX_REQUESTS)] == [True] * Config.RATE_LIMIT_MAX_REQUESTS
+    assert not _request_from('10.0.0.1')
+    assert _request_from('10.0.0.2')
+
+    clock.now += REFILL_INTERVAL
+    assert _request_from('10.0.0.1')
+    assert not _request_from('10.0.0.1')
+
+
+def test_rejection_writes_no_state(clock):
+    for _ in range(Config.RATE_LIMIT_MAX_REQUESTS):
+        _request_from('10.0.0.1')
+    _request_from('10.0.0.2')
+    before = list(utils.rate_limit_storage.items())
+
+    clock.now += REFILL_INTERVAL / 2
+    assert not _request_from('10.0.0.1')
+
+    assert list(utils.rate_limit_storage.items()) == before
+
+
+def test_least_recently_seen_client_is_evicted_at_the_cap(clock):
+    for index in range(utils.RATE_LIMIT_MAX_IPS):
+        assert utils._take_rate_limit_token(f'ip-{index}', clock())
+    utils._take_rate_limit_token('ip-0', clock())
+
+    utils._take_rate_limit_token('newcomer', clock())
+
+    assert len(utils.rate_limit_storage) == utils.RATE_LIMIT_MAX_IPS
+    assert 'ip-0' in utils.rate_limit_storage
+    assert 'ip-1' not in utils.rate_limit_storage
+    assert next(reversed(utils.rate_limit_storage)) == 'newcomer'
+
+
+def test_sweep_drops_refilled_buckets_at_most_once_a_minute(clock):
+    _request_from('10.0.0.1')
+    clock.now += Config.RATE_LIMIT_WINDOW / 2
+    _request_from('10.0.0.2')
+
+    clock.now += Config.RATE_LIMIT_WINDOW / 2
+    _request_from('10.0.0.3')
+    assert list(utils.rate_limit_storage) == ['10.0.0.2', '10.0.0.3']
+
+    clock.now += Config.RATE_LIMIT_WINDOW / 2 - 10
+    _request_from('10.0.0.4')
+    # 10.0.0.2 has refilled by now, but the last sweep ran under a minute ago
+    clock.now += 30
+    _request_from('10.0.0.4')
+    assert '10.0.0.2' in utils.rate_limit_storage
+
+    clock.now += 30
+    _request_from('10.0.0.4')
+    assert list(utils.rate_limit_storage) == ['10.0.0.3', '10.0.0.4']
@@ -0,0 +1,42 @@
+"""
+Tests for the per-request image upload cap
+"""
+
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('supabase')
+
+import app as app_module
+import utils
+from config import Config
+
+
+class _Cars:
+    def __init__(self):
+        self.created = []
+
+    def create_car(self, car_data):
+        self.created.append(car_data)
+        return {**car_data, 'id': car_data.get('id', 'car-1')}
+
+
+def test_too_many_images_are_rejected_before_any_upload(monkeypatch, admin_client):
+    cars = _Cars()
+    touched = []
+    monkeypatch.setattr(app_module, 'db_service', cars)
+    monkeypatch.setattr(utils, 'validate_image_file', lambda file: touched.append(file.filename))
+    monkeypatch.setattr(utils, 'upload_image_simple', lambda *args: touched.append(args))
+    images = [(BytesIO(b'\xff\xd8\xff'), f'car-{index}.jpg') for index in range(Config.MAX_IMAGES_PER_UPLOAD + 1)]
+
+    response = admin_client.post('/admin/cars', content_type='multipart/form-data', data={
+        'brand': 'Skoda', 'model': 'Octavia', 'year': '2022', 'class': 'standard', 'price_per_day': '60',
+        'images': images,
+    })
+
+    assert response.status_code == 400
+    assert 'Too many images' in response.get_json()['error']
+    assert touched == []
+    assert cars.created == []
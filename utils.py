@@ -7,99 +7,213 @@ import os
 import time
 import uuid
 import logging
-from datetime import datetime
-from flask import request
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import redis
+from flask import g, has_request_context, request
+from werkzeug.exceptions import TooManyRequests
 from config import Config
+from validators import get_image_mime_type, validate_image_file
 
 logger = logging.getLogger(__name__)
 
-# Simple rate limiting storage (in-memory for development)
-rate_limit_storage = {}
+# Process-wide DatabaseService for storage and usage helpers, created on first use
+_db_service = None
+_db_service_lock = threading.Lock()
 
-# Concurrency protection
-booking_locks = {}  # Simple in-memory locks per car_id
+# Admin usage overview row counts and storage listing, cached as (expires_at, value)
+USAGE_CACHE_TTL = 60
+_usage_counts_cache = (0.0, None)
+_storage_usage_cache = (0.0, None)
+
+# Object URLs name the bucket as the first path segment
+_BUCKET_PREFIX = f'{Config.SUPABASE_BUCKET}/'
+_BUCKET_PREFIX_LEN = len(_BUCKET_PREFIX)
+
+# Storage cleanup that doesn't need to finish before the response
+_storage_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='storage')
+
+# Multi-image uploads run in parallel, bounded so one request can't flood Storage
+_upload_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='upload')
+
+# Shared rate limiting storage (Redis, when REDIS_URL is configured)
+redis_client = redis.Redis.from_url(Config.REDIS_URL) if Config.REDIS_URL else None
+
+# Token bucket, same model as the in-memory fallback: a hash of (tokens, ts) per client
+# holding up to ARGV[3] tokens, refilled evenly over ARGV[2] seconds. O(1) memory per IP.
+# Runs atomically in Redis; returns 1 if the request is allowed, 0 (without writing) if over the limit.
+_RATE_LIMIT_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local last = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - last) * capacity / window)
+if tokens < 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(window))
+return 1
+"""
+rate_limit_script = redis_client.register_script(_RATE_LIMIT_LUA) if redis_client is not None else None
+
+# Fallback rate limiting storage (in-memory, per process): client IP -> (tokens, last_refill)
+# token buckets, least recently seen first and capped at RATE_LIMIT_MAX_IPS entries
+RATE_LIMIT_MAX_IPS = 16384
+rate_limit_storage: "OrderedDict[str, tuple]" = OrderedDict()
+_rate_limit_lock = threading.Lock()
+_next_rate_limit_purge = 0.0
 
 
 def get_client_ip() -> str:
-    """Get client IP address"""
-    if request.headers.get('X-Forwarded-For'):
-        return request.headers.get('X-Forwarded-For').split(',')[0].strip()
-    return request.remote_addr or 'unknown'
-
-
-def calculate_total_price(car_price: float, start_date: str, end_date: str) -> float:
-    """Calculate total price for booking"""
-    start = datetime.strptime(start_date, '%Y-%m-%d').date()
-    end = datetime.strptime(end_date, '%Y-%m-%d').date()
-    days = (end - start).days
-    total_price = car_price * days
-    
-    return total_price
+    """Get client IP address (resolved once per request and kept on g)"""
+    client_ip = g.get('client_ip')
+    if client_ip is None:
+        forwarded_for = request.headers.get('X-Forwarded-For')
+        if forwarded_for:
+            client_ip = forwarded_for.split(',', 1)[0].strip()
+        else:
+            client_ip = request.remote_addr or 'unknown'
+        g.client_ip = client_ip
+    return client_ip
+
+
+def now_iso() -> str:
+    """Current UTC time as an ISO 8601 string for created_at/updated_at columns.
+    Computed once per request so every write in a request shares one timestamp."""
+    if not has_request_context():
+        return datetime.now(timezone.utc).isoformat()
+    timestamp = g.get('now_iso')
+    if timestamp is None:
+        timestamp = g.now_iso = datetime.now(timezone.utc).isoformat()
+    return timestamp
 
 
 def check_rate_limit() -> None:
     """Enhanced rate limiting check"""
-    from werkzeug.exceptions import TooManyRequests
-    
     client_ip = get_client_ip()
-    current_time = time.time()
-    
-    if client_ip not in rate_limit_storage:
-        rate_limit_storage[client_ip] = {'count': 0, 'reset_time': current_time + Config.RATE_LIMIT_WINDOW}
     
-    # Reset counter if window expired
-    if current_time > rate_limit_storage[client_ip]['reset_time']:
-        rate_limit_storage[client_ip] = {'count': 0, 'reset_time': current_time + Config.RATE_LIMIT_WINDOW}
+    if redis_client is not None:
+        try:
+            # Wall-clock time, since the bucket state is shared across processes
+            allowed = _redis_rate_limit_allow(client_ip, time.time())
+        except redis.RedisError as e:
+            logger.warning("Redis rate limiting unavailable, using in-memory fallback: %s", e)
+        else:
+            if not allowed:
+                logger.warning("Rate limit exceeded for IP: %s", client_ip)
+                raise TooManyRequests("Rate limit exceeded. Maximum 5 bookings per hour per IP.")
+            return
     
-    # Check if limit exceeded
-    if rate_limit_storage[client_ip]['count'] >= Config.RATE_LIMIT_MAX_REQUESTS:
-        logger.warning(f"Rate limit exceeded for IP: {client_ip}")
+    # Per-process buckets use the monotonic clock, so a system clock change can't drain or refill them
+    if not _take_rate_limit_token(client_ip, time.monotonic()):
+        logger.warning("Rate limit exceeded for IP: %s", client_ip)
         raise TooManyRequests("Rate limit exceeded. Maximum 5 bookings per hour per IP.")
+
+
+def _take_rate_limit_token(client_ip: str, current_time: float) -> bool:
+    """Spend one token from the client's in-memory bucket; False if it is empty.
+    Buckets hold RATE_LIMIT_MAX_REQUESTS tokens and refill evenly over RATE_LIMIT_WINDOW."""
+    capacity = Config.RATE_LIMIT_MAX_REQUESTS
+    refill_rate = capacity / Config.RATE_LIMIT_WINDOW
     
-    # Increment counter
-    rate_limit_storage[client_ip]['count'] += 1
+    with _rate_limit_lock:
+        _purge_expired_rate_limits(current_time)
+        
+        tokens, last_refill = rate_limit_storage.get(client_ip, (capacity, current_time))
+        tokens = min(capacity, tokens + (current_time - last_refill) * refill_rate)
+        if tokens < 1:
+            # Refill is linear, so the stored state already yields the right count next time;
+            # rejecting without a write lets the sweep reclaim the entry once the burst ends
+            return False
+        
+        rate_limit_storage[client_ip] = (tokens - 1, current_time)
+        rate_limit_storage.move_to_end(client_ip)
+        
+        # Evict the least recently seen clients once the map is full
+        while len(rate_limit_storage) > RATE_LIMIT_MAX_IPS:
+            rate_limit_storage.popitem(last=False)
+        return True
 
 
-def upload_image_simple(file, car_id: str) -> str:
-    """Upload single image and return URL - Alternative version"""
-    from database import DatabaseService
+def _redis_rate_limit_allow(client_ip: str, current_time: float) -> bool:
+    """Spend a token from the client's Redis bucket; False if it is empty"""
+    # EVALSHA with automatic SCRIPT LOAD on first use
+    allowed = rate_limit_script(
+        keys=[f"ratelimit:bucket:{client_ip}"],
+        args=[current_time, Config.RATE_LIMIT_WINDOW, Config.RATE_LIMIT_MAX_REQUESTS]
+    )
+    return allowed == 1
+
+
+def _purge_expired_rate_limits(current_time: float) -> None:
+    """Drop in-memory buckets that have fully refilled (same as having no entry); caller holds the lock"""
+    global _next_rate_limit_purge
     
+    if current_time < _next_rate_limit_purge:
+        return
+    
+    # Oldest entries come first, so stop at the first one still refilling
+    while rate_limit_storage:
+        ip, (_, last_refill) = next(iter(rate_limit_storage.items()))
+        if current_time - last_refill < Config.RATE_LIMIT_WINDOW:
+            break
+        rate_limit_storage.popitem(last=False)
+    
+    _next_rate_limit_purge = current_time + 60
+
+
+def _get_db_service():
+    """Get the shared DatabaseService, creating it once per process"""
+    global _db_service
+    if _db_service is not None:
+        return _db_service
+
+    # database imports utils, so this import stays lazy; it runs once per process
+    from database import DatabaseService
+    with _db_service_lock:
+        if _db_service is None:
+            _db_service = DatabaseService(Config.SUPABASE_URL, Config.SUPABASE_ANON_KEY, Config.SUPABASE_SERVICE_ROLE_KEY)
+        return _db_service
+
+
+def upload_image_simple(content: bytes, filename: str, car_id: str) -> str:
+    """Upload validated image content and return URL - Alternative version"""
     try:
-        file_ext = file.filename.rsplit('.', 1)[1].lower()
+        file_ext = filename.rpartition('.')[2].lower()
         timestamp = int(time.time())
         unique_id = uuid.uuid4().hex[:8]
         filename = f"car_{car_id}_{timestamp}_{unique_id}.{file_ext}"
         
-        # Read file content
-        file_content = file.read()
-        file.seek(0)
-        
         # Use admin client for upload
-        db_service = DatabaseService(Config.SUPABASE_URL, Config.SUPABASE_ANON_KEY, Config.SUPABASE_SERVICE_ROLE_KEY)
-        admin_client = db_service.get_admin_client()
+        admin_client = _get_db_service().get_admin_client()
         
-        # Simple upload without options
+        # Upload with the detected content type so the image is served correctly
         response = admin_client.storage.from_(Config.SUPABASE_BUCKET).upload(
             filename,
-            file_content
+            content,
+            {'content-type': get_image_mime_type(content[:12])}
         )
         
         # Get public URL
         public_url = admin_client.storage.from_(Config.SUPABASE_BUCKET).get_public_url(filename)
         
-        logger.info(f"Successfully uploaded image: {filename} -> {public_url}")
+        logger.info("Successfully uploaded image: %s -> %s", filename, public_url)
         return public_url
         
     except Exception as e:
-        logger.error(f"Error uploading image: {e}", exc_info=True)
+        logger.error("Error uploading image: %s", e, exc_info=True)
         raise Exception(f"Failed to upload image: {str(e)}")
 
 
 def upload_multiple_images(files, car_id: str) -> list:
     """Upload multiple images and return array of URLs"""
     try:
-        uploaded_urls = []
-        
         # Filter out empty files and validate
         valid_files = []
         for file in files:
@@ -107,139 +221,184 @@ def upload_multiple_images(files, car_id: str) -> list:
             if (file and 
                 hasattr(file, 'filename') and 
                 hasattr(file, 'read') and 
-                hasattr(file, 'seek') and
                 file.filename and 
                 file.filename.strip()):
                 valid_files.append(file)
-                logger.debug(f"Valid file found: {file.filename}")
+                logger.debug("Valid file found: %s", file.filename)
             else:
-                logger.debug(f"Skipping invalid file object: {type(file)}")
+                logger.debug("Skipping invalid file object: %s", type(file))
         
         if not valid_files:
             logger.warning("No valid files provided for upload")
             return []
         
-        # Upload each file
+        if len(valid_files) > Config.MAX_IMAGES_PER_UPLOAD:
+            raise Exception(f"Too many images. Maximum {Config.MAX_IMAGES_PER_UPLOAD} per upload")
+        
+        # Read and validate every file before uploading any, so a bad file
+        # doesn't cost uploads that then have to be rolled back
+        contents = []
         for file in valid_files:
             try:
-                logger.info(f"Processing file: {file.filename}")
-                from validators import validate_image_file
-                validate_image_file(file)
-                image_url = upload_image_simple(file, car_id)
-                uploaded_urls.append(image_url)
-                logger.info(f"Successfully uploaded: {file.filename}")
+                logger.info("Processing file: %s", file.filename)
+                contents.append((file.filename, validate_image_file(file)))
             except Exception as file_error:
-                logger.error(f"Failed to upload {file.filename}: {file_error}")
-                # Clean up any successfully uploaded images before failing
-                for url in uploaded_urls:
-                    try:
-                        delete_image_simple(url)
-                    except:
-                        pass
+                logger.error("Failed to upload %s: %s", file.filename, file_error)
                 raise Exception(f"Failed to upload {file.filename}: {str(file_error)}")
         
-        logger.info(f"Successfully uploaded {len(uploaded_urls)} images")
+        # Upload the files concurrently, keeping the URLs in input order
+        futures = [_upload_pool.submit(upload_image_simple, content, filename, car_id) for filename, content in contents]
+        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        failed = next((index for index, future in enumerate(futures) if future in done and future.exception()), None)
+        
+        if failed is not None:
+            filename = contents[failed][0]
+            file_error = futures[failed].exception()
+            logger.error("Failed to upload %s: %s", filename, file_error)
+            # Stop queued uploads, let running ones finish, then clean up everything that landed
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            delete_images([future.result() for future in futures if not future.cancelled() and not future.exception()])
+            raise Exception(f"Failed to upload {filename}: {str(file_error)}")
+        
+        uploaded_urls = [future.result() for future in futures]
+        
+        logger.info("Successfully uploaded %s images", len(uploaded_urls))
         return uploaded_urls
         
     except Exception as e:
-        logger.error(f"Error in upload_multiple_images: {e}")
+        logger.error("Error in upload_multiple_images: %s", e)
         raise
 
 
-def delete_image_simple(image_url: str) -> bool:
-    """Delete image from storage by URL - FIXED VERSION"""
-    from database import DatabaseService
+def _storage_filename(image_url: str) -> str:
+    """Extract the object name inside the bucket from a storage URL"""
+    # Expected format: https://[project].supabase.co/storage/v1/object/public/cars/filename.ext
+    # OR: https://[project].supabase.co/storage/v1/object/sign/cars/filename.ext?token=...
+    path = urlsplit(image_url).path
+    object_path = path.partition('/storage/v1/object/')[2] or path
+    object_path = object_path.removeprefix('public/').removeprefix('sign/')
+    
+    # Remove bucket name, falling back to the last path segment
+    if object_path.startswith(_BUCKET_PREFIX):
+        return object_path[_BUCKET_PREFIX_LEN:]
+    return object_path.rpartition('/')[2]
+
+
+def delete_images(image_urls: list) -> bool:
+    """Delete images from storage by URL in a single remove call"""
+    filenames = [_storage_filename(url) for url in image_urls if url]
+    filenames = [name for name in filenames if name]
+    if not filenames:
+        return True
     
     try:
-        if not image_url:
-            logger.warning("No image URL provided for deletion")
-            return True
-        
-        # Extract filename from URL
-        # Expected format: https://[project].supabase.co/storage/v1/object/public/cars/filename.ext
-        # OR: https://[project].supabase.co/storage/v1/object/sign/cars/filename.ext?token=...
-        
-        # Parse the URL to get the filename
-        if '/storage/v1/object/' in image_url:
-            # Split by the storage path
-            parts = image_url.split('/storage/v1/object/')
-            if len(parts) > 1:
-                # Get everything after 'public/cars/' or 'sign/cars/'
-                path_part = parts[1]
-                
-                # Remove 'public/' or 'sign/' prefix
-                if path_part.startswith('public/'):
-                    path_part = path_part[7:]  # Remove 'public/'
-                elif path_part.startswith('sign/'):
-                    path_part = path_part[5:]  # Remove 'sign/'
-                
-                # Remove bucket name and get filename
-                if path_part.startswith(f'{Config.SUPABASE_BUCKET}/'):
-                    filename = path_part[len(Config.SUPABASE_BUCKET) + 1:]
-                    
-                    # Remove any query parameters (for signed URLs)
-                    if '?' in filename:
-                        filename = filename.split('?')[0]
-                else:
-                    # Fallback to simple extraction
-                    filename = image_url.split('/')[-1].split('?')[0]
-            else:
-                filename = image_url.split('/')[-1].split('?')[0]
-        else:
-            # Fallback: just get the last part of the URL
-            filename = image_url.split('/')[-1].split('?')[0]
-        
-        if not filename:
-            logger.error(f"Could not extract filename from URL: {image_url}")
-            return False
-        
-        logger.info(f"Attempting to delete file: {filename} from bucket: {Config.SUPABASE_BUCKET}")
+        logger.info("Deleting %s file(s) from bucket %s: %s", len(filenames), Config.SUPABASE_BUCKET, filenames)
         
         # Use admin client with service role key for deletion
-        db_service = DatabaseService(Config.SUPABASE_URL, Config.SUPABASE_ANON_KEY, Config.SUPABASE_SERVICE_ROLE_KEY)
-        admin_client = db_service.get_admin_client()
+        admin_client = _get_db_service().get_admin_client()
         
-        # Delete from storage - note the list format
-        try:
-            result = admin_client.storage.from_(Config.SUPABASE_BUCKET).remove([filename])
-            
-            # Log the result
-            logger.info(f"Delete operation completed for: {filename}")
-            logger.debug(f"Delete result: {result}")
-            
-            # Verify deletion by checking if file still exists
-            try:
-                files = admin_client.storage.from_(Config.SUPABASE_BUCKET).list()
-                file_exists = any(f['name'] == filename for f in (files or []))
-                
-                if not file_exists:
-                    logger.info(f"Confirmed: File {filename} successfully deleted from storage")
-                    return True
-                else:
-                    logger.warning(f"File {filename} still exists after delete attempt")
-                    return False
-                    
-            except Exception as verify_error:
-                logger.warning(f"Could not verify deletion: {verify_error}")
-                # Assume success if we can't verify
-                return True
-                
-        except Exception as delete_error:
-            logger.error(f"Delete operation failed: {delete_error}")
+        # Storage returns the objects it actually removed
+        removed = admin_client.storage.from_(Config.SUPABASE_BUCKET).remove(filenames) or []
+        if len(removed) < len(filenames):
+            logger.warning("Only %s of %s files were deleted from storage", len(removed), len(filenames))
             return False
+        return True
         
     except Exception as e:
-        logger.error(f"Error in delete_image_simple for URL {image_url}: {e}")
+        logger.error("Error deleting images %s: %s", filenames, e)
         # Return True to not block other operations
         return True
 
 
-def get_usage_statistics() -> dict:
-    """Get usage statistics for database and storage"""
-    from database import DatabaseService
+def delete_images_async(image_urls: list) -> None:
+    """Queue a storage delete so the request doesn't wait on it"""
+    _storage_pool.submit(delete_images, list(image_urls))
+
+
+def _get_usage_counts(db_service, force: bool = False) -> dict:
+    """Car and booking counts for the usage overview, cached for USAGE_CACHE_TTL seconds unless forced"""
+    global _usage_counts_cache
+    
+    expires_at, counts = _usage_counts_cache
+    now = time.monotonic()
+    if counts is None or now >= expires_at or force:
+        counts = db_service.get_usage_counts()
+        _usage_counts_cache = (now + USAGE_CACHE_TTL, counts)
+    return counts
+
+
+def _get_storage_usage(db_service, force: bool = False) -> dict:
+    """Per-bucket file counts and sizes, cached for USAGE_CACHE_TTL seconds unless forced"""
+    global _storage_usage_cache
+    
+    expires_at, storage = _storage_usage_cache
+    now = time.monotonic()
+    if storage is not None and now < expires_at and not force:
+        return storage
+    
+    logger.info("Checking storage usage...")
+    total_files = 0
+    total_size_bytes = 0
+    bucket_details = {}
     
+    # Known buckets to check
+    known_buckets = [Config.SUPABASE_BUCKET]
+    
+    for bucket_name in known_buckets:
+        try:
+            logger.info("Checking bucket: %s", bucket_name)
+            files = db_service.supabase.storage.from_(bucket_name).list()
+            bucket_files = len(files) if files else 0
+            total_files += bucket_files
+            
+            # Calculate total size in bytes (folder entries have no metadata)
+            sizes = ((file.get('metadata') or {}).get('size') for file in files or ())
+            bucket_size_bytes = sum(size for size in sizes if isinstance(size, (int, float)))
+            
+            total_size_bytes += bucket_size_bytes
+            
+            # Convert to MB
+            bucket_size_mb = round(bucket_size_bytes / (1024 * 1024), 2)
+            
+            logger.info("Bucket %s has %s files, total size: %s MB", bucket_name, bucket_files, bucket_size_mb)
+            
+            bucket_details[bucket_name] = {
+                'files_count': bucket_files,
+                'size_bytes': bucket_size_bytes,
+                'size_mb': bucket_size_mb,
+                'sample_files': files[:3] if files else []  # First 3 files as sample
+            }
+        except Exception as e:
+            logger.error("Error accessing bucket %s: %s", bucket_name, e)
+            bucket_details[bucket_name] = {
+                'files_count': 0,
+                'error': str(e)
+            }
+    
+    # Calculate total storage size
+    total_size_mb = round(total_size_bytes / (1024 * 1024), 2)
+    total_size_gb = round(total_size_mb / 1024, 3)
+    
+    storage = {
+        'total_files': total_files,
+        'total_size_mb': total_size_mb,
+        'total_size_gb': total_size_gb,
+        'buckets': bucket_details,
+        'estimated_usage_note': 'Check Supabase Dashboard for exact storage usage'
+    }
+    
+    # Don't cache a partial listing
+    if not any('error' in details for details in bucket_details.values()):
+        _storage_usage_cache = (now + USAGE_CACHE_TTL, storage)
+    return storage
+
+
+def get_usage_statistics(force: bool = False) -> dict:
+    """Get usage statistics for database and storage; force bypasses the cached counts and listing"""
     try:
-        db_service = DatabaseService(Config.SUPABASE_URL, Config.SUPABASE_ANON_KEY, Config.SUPABASE_SERVICE_ROLE_KEY)
+        db_service = _get_db_service()
         
         overview = {
             'database': {},
@@ -252,15 +411,14 @@ def get_usage_statistics() -> dict:
         
         # Database usage - estimate based on record counts
         try:
-            cars_count = db_service.supabase.table('cars').select('id', count='exact').execute()
-            bookings_count = db_service.supabase.table('bookings').select('id', count='exact').execute()
+            counts = _get_usage_counts(db_service, force)
             
             # Estimate size (very rough)
-            estimated_size_mb = (cars_count.count * 0.1) + (bookings_count.count * 0.05)  # KB per record
+            estimated_size_mb = (counts['cars'] * 0.1) + (counts['bookings'] * 0.05)  # KB per record
             
             overview['database'] = {
-                'cars_count': cars_count.count,
-                'bookings_count': bookings_count.count,
+                'cars_count': counts['cars'],
+                'bookings_count': counts['bookings'],
                 'estimated_size_mb': round(estimated_size_mb, 2),
                 'usage_percent': round((estimated_size_mb / Config.DATABASE_LIMIT_MB) * 100, 1)
             }
@@ -270,67 +428,13 @@ def get_usage_statistics() -> dict:
         
         # Storage usage
         try:
-            logger.info("Checking storage usage...")
-            total_files = 0
-            total_size_bytes = 0
-            bucket_details = {}
-            
-            # Known buckets to check
-            known_buckets = [Config.SUPABASE_BUCKET]
-            
-            for bucket_name in known_buckets:
-                try:
-                    logger.info(f"Checking bucket: {bucket_name}")
-                    files = db_service.supabase.storage.from_(bucket_name).list()
-                    bucket_files = len(files) if files else 0
-                    total_files += bucket_files
-                    
-                    # Calculate total size in bytes
-                    bucket_size_bytes = 0
-                    if files:
-                        for file in files:
-                            file_size = file.get('metadata', {}).get('size', 0)
-                            if isinstance(file_size, (int, float)):
-                                bucket_size_bytes += file_size
-                    
-                    total_size_bytes += bucket_size_bytes
-                    
-                    # Convert to MB
-                    bucket_size_mb = round(bucket_size_bytes / (1024 * 1024), 2)
-                    
-                    logger.info(f"Bucket {bucket_name} has {bucket_files} files, total size: {bucket_size_mb} MB")
-                    
-                    bucket_details[bucket_name] = {
-                        'files_count': bucket_files,
-                        'size_bytes': bucket_size_bytes,
-                        'size_mb': bucket_size_mb,
-                        'sample_files': files[:3] if files else []  # First 3 files as sample
-                    }
-                except Exception as e:
-                    logger.error(f"Error accessing bucket {bucket_name}: {e}")
-                    bucket_details[bucket_name] = {
-                        'files_count': 0,
-                        'error': str(e)
-                    }
-            
-            # Calculate total storage size
-            total_size_mb = round(total_size_bytes / (1024 * 1024), 2)
-            total_size_gb = round(total_size_mb / 1024, 3)
-            
-            overview['storage'] = {
-                'total_files': total_files,
-                'total_size_mb': total_size_mb,
-                'total_size_gb': total_size_gb,
-                'buckets': bucket_details,
-                'estimated_usage_note': 'Check Supabase Dashboard for exact storage usage'
-            }
-            
+            overview['storage'] = _get_storage_usage(db_service, force)
         except Exception as e:
-            logger.error(f"Error getting storage info: {e}")
+            logger.error("Error getting storage info: %s", e)
             overview['storage'] = {'error': str(e)}
         
         return overview
         
     except Exception as e:
-        logger.error(f"Error getting usage statistics: {e}")
+        logger.error("Error getting usage statistics: %s", e)
         raise
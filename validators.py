@@ -5,30 +5,148 @@ Contains all validation functions for data validation
 
 import re
 import json
-import uuid
-from datetime import datetime
+import logging
+from datetime import date, datetime, timedelta, timezone
 from werkzeug.exceptions import BadRequest
 from config import Config
 
+# Precompiled patterns for the booking/contact hot paths
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_PHONE_DIGITS_RE = re.compile(r'\D')
+# Deletes every ASCII non-digit in one C-level pass
+_ASCII_NON_DIGITS = str.maketrans('', '', ''.join(chr(i) for i in range(128) if not chr(i).isdigit()))
+_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', re.IGNORECASE)
+# Postgres/PostgREST timestamp: 'T' or space separator, optional fraction, offset as Z, +HH, +HHMM or +HH:MM
+_TIMESTAMP_RE = re.compile(r'(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})(?:\.(\d{1,6}))?(Z|[+-]\d{2}(?::?\d{2})?)?')
+_NAME_RE = re.compile(r'^[a-zA-Zа-яА-Я\s\-\.]{2,50}$')
+
+# Hash-set copies of the allowed values for O(1) membership checks
+_HONEYPOT_SET = frozenset(Config.HONEYPOT_FIELDS)
+_FUEL_TYPES = frozenset(Config.ALLOWED_FUEL_TYPES)
+_TRANSMISSIONS = frozenset(Config.ALLOWED_TRANSMISSIONS)
+_CAR_CLASSES = frozenset(Config.ALLOWED_CAR_CLASSES)
+_PAYMENT_METHODS = frozenset(Config.ALLOWED_PAYMENT_METHODS)
+_EXTENSIONS = frozenset(Config.ALLOWED_EXTENSIONS)
+_BOOKING_STATUSES = frozenset(Config.VALID_BOOKING_STATUSES)
+_DEPOSIT_STATUSES = frozenset(Config.VALID_DEPOSIT_STATUSES)
+
+# Allowed-value lists as shown in error messages, joined once
+_FUEL_TYPES_TEXT = ', '.join(Config.ALLOWED_FUEL_TYPES)
+_TRANSMISSIONS_TEXT = ', '.join(Config.ALLOWED_TRANSMISSIONS)
+_CAR_CLASSES_TEXT = ', '.join(Config.ALLOWED_CAR_CLASSES)
+_PAYMENT_METHODS_TEXT = ', '.join(Config.ALLOWED_PAYMENT_METHODS)
+_EXTENSIONS_TEXT = ', '.join(sorted(Config.ALLOWED_EXTENSIONS))
+_BOOKING_STATUSES_TEXT = ', '.join(Config.VALID_BOOKING_STATUSES)
+_DEPOSIT_STATUSES_TEXT = ', '.join(Config.VALID_DEPOSIT_STATUSES)
+
+logger = logging.getLogger(__name__)
+
+def is_valid_uuid(value) -> bool:
+    """Check for a canonical UUID string without building a uuid.UUID"""
+    return isinstance(value, str) and _UUID_RE.fullmatch(value) is not None
+
 def validate_email(email: str) -> bool:
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 def validate_phone(phone: str) -> bool:
     """Validate Bulgarian phone format"""
-    # Remove all non-digit characters
-    clean_phone = re.sub(r'\D', '', phone)
+    # Remove all non-digit characters (regex only for the rare non-ASCII input)
+    clean_phone = phone.translate(_ASCII_NON_DIGITS)
+    if not clean_phone.isascii():
+        clean_phone = _PHONE_DIGITS_RE.sub('', clean_phone)
     return len(clean_phone) >= 10 and len(clean_phone) <= 15
 
+def parse_date(date_str: str) -> date:
+    """Parse a strict YYYY-MM-DD date, raising ValueError otherwise"""
+    # fromisoformat also accepts compact/week forms, so pin the shape first
+    if not isinstance(date_str, str) or len(date_str) != 10 or date_str[4] != '-' or date_str[7] != '-':
+        raise ValueError(f"Invalid date: {date_str!r}")
+    return date.fromisoformat(date_str)
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a timestamp to an aware UTC datetime (no offset means UTC), raising ValueError otherwise"""
+    match = _TIMESTAMP_RE.fullmatch(value) if isinstance(value, str) else None
+    if match is None:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    day, clock, fraction, offset = match.groups()
+    # Rebuilt from the parts because fromisoformat only takes 3/6-digit fractions before Python 3.11
+    parsed = datetime.fromisoformat(f"{day}T{clock}").replace(microsecond=int((fraction or '0').ljust(6, '0')))
+    tz = timezone.utc
+    if offset and offset != 'Z':
+        digits = offset[1:].replace(':', '')
+        delta = timedelta(hours=int(digits[:2]), minutes=int(digits[2:] or 0))
+        tz = timezone(-delta if offset[0] == '-' else delta)
+    return parsed.replace(tzinfo=tz).astimezone(timezone.utc)
+
 def validate_date_format(date_str: str) -> bool:
     """Validate date format YYYY-MM-DD"""
     try:
-        datetime.strptime(date_str, '%Y-%m-%d')
+        parse_date(date_str)
         return True
     except ValueError:
         return False
 
+_TRUTHY = frozenset({'true', '1', 'yes', 'on'})
+
+def _parse_features(value: str) -> list:
+    """Features arrive as a JSON array or a comma-separated list"""
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return [feature.strip() for feature in value.split(',') if feature.strip()]
+
+def _parse_image_urls(value: str) -> list:
+    """Image URLs arrive as a JSON array (or 'null')"""
+    try:
+        return json.loads(value) if value != 'null' else []
+    except json.JSONDecodeError:
+        return []
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() in _TRUTHY
+
+# Per-field coercers for multipart car forms; other fields stay strings
+_CAR_FORM_COERCERS = {
+    'features': _parse_features,
+    'image_urls': _parse_image_urls,
+    'year': int,
+    'seats': int,
+    'large_luggage': int,
+    'small_luggage': int,
+    'doors': int,
+    'min_age': int,
+    'price_per_day': float,
+    'deposit_amount': float,
+    'is_active': _parse_bool,
+    'four_wd': _parse_bool,
+    'ac': _parse_bool,
+}
+
+def parse_car_form(form) -> dict:
+    """Convert multipart car form fields to typed values, skipping empty and unparseable ones"""
+    car_data = {}
+    for key, value in form.items():
+        if value == '':
+            continue
+        coerce = _CAR_FORM_COERCERS.get(key)
+        if coerce is None:
+            car_data[key] = value
+            continue
+        try:
+            car_data[key] = coerce(value)
+        except (ValueError, TypeError):
+            pass
+    return car_data
+
+def check_honeypot(data: dict) -> None:
+    """Reject submissions that fill any honeypot field"""
+    filled = [field for field in _HONEYPOT_SET & data.keys() if data[field]]
+    if filled:
+        from utils import get_client_ip  # utils imports validators; only reached for spam
+        logger.warning("Honeypot field(s) %s filled from IP: %s", ', '.join(filled), get_client_ip())
+        raise BadRequest("Invalid form submission")
+
 def validate_car_data(data: dict) -> dict:
     """Validate car data for create/update operations"""
     required_fields = ['brand', 'model', 'year', 'class', 'price_per_day']
@@ -37,31 +155,33 @@ def validate_car_data(data: dict) -> dict:
         if field not in data or not data[field]:
             raise BadRequest(f"Missing required field: {field}")
     
-    # Validate year
+    # Validate year (coerced values are written back so callers don't re-parse)
     try:
         year = int(data['year'])
-        current_year = datetime.now().year
-        if year < 1900 or year > current_year + 2:
-            raise BadRequest("Invalid year")
     except (ValueError, TypeError):
         raise BadRequest("Year must be a valid number")
+    if year < 1900 or year > datetime.now().year + 2:
+        raise BadRequest("Invalid year")
+    data['year'] = year
     
     # Validate price
     try:
         price = float(data['price_per_day'])
-        if price <= 0:
-            raise BadRequest("Price must be positive")
     except (ValueError, TypeError):
         raise BadRequest("Price must be a valid number")
+    if price <= 0:
+        raise BadRequest("Price must be positive")
+    data['price_per_day'] = price
     
     # Validate deposit amount if provided
-    if 'deposit_amount' in data and data['deposit_amount'] is not None:
+    if data.get('deposit_amount') is not None:
         try:
             deposit = float(data['deposit_amount'])
-            if deposit < 0:
-                raise BadRequest("Deposit amount cannot be negative")
         except (ValueError, TypeError):
             raise BadRequest("Deposit amount must be a valid number")
+        if deposit < 0:
+            raise BadRequest("Deposit amount cannot be negative")
+        data['deposit_amount'] = deposit
     
     # Validate features if provided
     if 'features' in data and data['features'] is not None:
@@ -76,17 +196,17 @@ def validate_car_data(data: dict) -> dict:
     
     # Validate fuel type if provided
     if 'fuel_type' in data and data['fuel_type']:
-        if data['fuel_type'] not in Config.ALLOWED_FUEL_TYPES:
-            raise BadRequest(f"Invalid fuel type. Allowed: {', '.join(Config.ALLOWED_FUEL_TYPES)}")
+        if data['fuel_type'] not in _FUEL_TYPES:
+            raise BadRequest(f"Invalid fuel type. Allowed: {_FUEL_TYPES_TEXT}")
     
     # Validate transmission if provided
     if 'transmission' in data and data['transmission']:
-        if data['transmission'] not in Config.ALLOWED_TRANSMISSIONS:
-            raise BadRequest(f"Invalid transmission. Allowed: {', '.join(Config.ALLOWED_TRANSMISSIONS)}")
+        if data['transmission'] not in _TRANSMISSIONS:
+            raise BadRequest(f"Invalid transmission. Allowed: {_TRANSMISSIONS_TEXT}")
     
     # Validate car class
-    if data['class'] not in Config.ALLOWED_CAR_CLASSES:
-        raise BadRequest(f"Invalid car class. Allowed: {', '.join(Config.ALLOWED_CAR_CLASSES)}")
+    if data['class'] not in _CAR_CLASSES:
+        raise BadRequest(f"Invalid car class. Allowed: {_CAR_CLASSES_TEXT}")
     
     return data
 
@@ -99,47 +219,44 @@ def validate_booking_data(data: dict) -> dict:
             raise BadRequest(f"Missing required field: {field}")
     
     # Honeypot check - reject if any honeypot field is filled
-    for honeypot in Config.HONEYPOT_FIELDS:
-        if honeypot in data and data[honeypot]:
-            from utils import get_client_ip
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Honeypot field '{honeypot}' was filled from IP: {get_client_ip()}")
-            raise BadRequest("Invalid form submission")
+    check_honeypot(data)
     
     # Validate dates
     try:
-        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
-        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
-        today = datetime.now().date()
-        
-        if start_date >= end_date:
-            raise BadRequest("Start date must be before end date")
-        
-        if start_date <= today:
-            raise BadRequest("Start date must be from tomorrow onwards")
-        
-        # Minimum rental period
-        if (end_date - start_date).days < Config.MIN_RENTAL_DAYS:
-            raise BadRequest(f"Minimum rental period is {Config.MIN_RENTAL_DAYS} days")
-        
-        # Maximum rental period
-        if (end_date - start_date).days > Config.MAX_RENTAL_DAYS:
-            raise BadRequest(f"Maximum rental period is {Config.MAX_RENTAL_DAYS} days")
-        
-        # Cannot book too far in advance
-        if (start_date - today).days > Config.MAX_ADVANCE_BOOKING_DAYS:
-            raise BadRequest(f"Cannot book more than {Config.MAX_ADVANCE_BOOKING_DAYS} days in advance")
-            
+        start_date = parse_date(data['start_date'])
+        end_date = parse_date(data['end_date'])
     except ValueError:
         raise BadRequest("Invalid date format. Use YYYY-MM-DD")
     
+    today = date.today()
+    rental_days = (end_date - start_date).days
+    
+    if start_date >= end_date:
+        raise BadRequest("Start date must be before end date")
+    
+    if start_date <= today:
+        raise BadRequest("Start date must be from tomorrow onwards")
+    
+    # Minimum rental period
+    if rental_days < Config.MIN_RENTAL_DAYS:
+        raise BadRequest(f"Minimum rental period is {Config.MIN_RENTAL_DAYS} days")
+    
+    # Maximum rental period
+    if rental_days > Config.MAX_RENTAL_DAYS:
+        raise BadRequest(f"Maximum rental period is {Config.MAX_RENTAL_DAYS} days")
+    
+    # Cannot book too far in advance
+    if (start_date - today).days > Config.MAX_ADVANCE_BOOKING_DAYS:
+        raise BadRequest(f"Cannot book more than {Config.MAX_ADVANCE_BOOKING_DAYS} days in advance")
+    
+    data['rental_days'] = rental_days
+    
     # Validate client last name (minimum 2 characters, letters, spaces and common characters)
-    if not re.match(r'^[a-zA-Zа-яА-Я\s\-\.]{2,50}$', data['client_last_name'].strip()):
+    if not _NAME_RE.match(data['client_last_name'].strip()):
         raise BadRequest("Invalid client last name format")
     
     # Validate client first name (minimum 2 characters, letters, spaces and common characters)
-    if not re.match(r'^[a-zA-Zа-яА-Я\s\-\.]{2,50}$', data['client_first_name'].strip()):
+    if not _NAME_RE.match(data['client_first_name'].strip()):
         raise BadRequest("Invalid client first name format")
     
     # Validate email
@@ -151,64 +268,80 @@ def validate_booking_data(data: dict) -> dict:
         raise BadRequest("Invalid phone number format")
     
     # Validate car_id is valid UUID
-    try:
-        uuid.UUID(data['car_id'])
-    except ValueError:
+    if not is_valid_uuid(data['car_id']):
         raise BadRequest("Invalid car ID format")
     
     # Validate payment method
     payment_method = data.get('payment_method', 'cash')
-    if payment_method not in Config.ALLOWED_PAYMENT_METHODS:
-        raise BadRequest(f"Invalid payment method. Allowed: {', '.join(Config.ALLOWED_PAYMENT_METHODS)}")
+    if payment_method not in _PAYMENT_METHODS:
+        raise BadRequest(f"Invalid payment method. Allowed: {_PAYMENT_METHODS_TEXT}")
     
     return data
 
-def validate_image_file(file) -> bool:
-    """Validate uploaded image file"""
-    import logging
-    logger = logging.getLogger(__name__)
-    
+def get_image_mime_type(content: bytes):
+    """Detect image MIME type from magic bytes, None if not a supported image"""
+    if content.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if content.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if content.startswith((b'GIF87a', b'GIF89a')):
+        return 'image/gif'
+    if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+def validate_image_file(file) -> bytes:
+    """Validate uploaded image file and return its content"""
     try:
-        logger.debug(f"Validating file: {file.filename}")
+        logger.debug("Validating file: %s", file.filename)
         
         if not file or not hasattr(file, 'filename') or file.filename == '':
             raise BadRequest("No file selected")
         
         # Check if it's actually a file object
-        if not hasattr(file, 'seek') or not hasattr(file, 'tell') or not hasattr(file, 'read'):
-            logger.error(f"Invalid file object: {type(file)}")
+        if not hasattr(file, 'read'):
+            logger.error("Invalid file object: %s", type(file))
             raise BadRequest("Invalid file object")
         
         # Check file extension
         if not allowed_file(file.filename):
-            raise BadRequest(f"File type not allowed. Allowed types: {', '.join(Config.ALLOWED_EXTENSIONS)}")
+            raise BadRequest(f"File type not allowed. Allowed types: {_EXTENSIONS_TEXT}")
         
-        # Check file size
-        file.seek(0, 2)  # Seek to end
-        file_length = file.tell()
-        file.seek(0)  # Reset file pointer
+        too_large = f"File size too large. Maximum size: {Config.MAX_FILE_SIZE/1024/1024:.1f}MB"
         
-        logger.debug(f"File size: {file_length} bytes")
-        if file_length > Config.MAX_FILE_SIZE:
-            raise BadRequest(f"File size too large. Maximum size: {Config.MAX_FILE_SIZE/1024/1024:.1f}MB")
+        # Reject up front when the multipart headers already declare an oversized part
+        if (getattr(file, 'content_length', 0) or 0) > Config.MAX_FILE_SIZE:
+            raise BadRequest(too_large)
         
-        if file_length == 0:
+        # Read once (one byte past the limit is enough to detect oversized files)
+        content = file.read(Config.MAX_FILE_SIZE + 1)
+        
+        logger.debug("File size: %s bytes", len(content))
+        if len(content) > Config.MAX_FILE_SIZE:
+            raise BadRequest(too_large)
+        
+        if len(content) == 0:
             raise BadRequest("File is empty")
         
-        logger.debug(f"File validation passed for: {file.filename}")
-        return True
+        # Check the content is really an image rather than trusting the extension
+        if get_image_mime_type(content[:12]) is None:
+            raise BadRequest("File content is not a supported image")
+        
+        logger.debug("File validation passed for: %s", file.filename)
+        return content
         
     except BadRequest:
         raise
     except Exception as e:
-        logger.error(f"Error validating file: {e}")
+        logger.error("Error validating file: %s", e)
         raise BadRequest(f"Error validating file: {str(e)}")
 
 def allowed_file(filename: str) -> bool:
     """Check if uploaded file is allowed"""
     if not filename:
         return False
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
+    _, dot, extension = filename.rpartition('.')
+    return bool(dot) and extension.lower() in _EXTENSIONS
 
 def validate_contact_form_data(data: dict) -> dict:
     """Validate contact form data"""
@@ -218,13 +351,7 @@ def validate_contact_form_data(data: dict) -> dict:
             raise BadRequest(f"Missing required field: {field}")
     
     # Honeypot check
-    for honeypot in Config.HONEYPOT_FIELDS:
-        if honeypot in data and data[honeypot]:
-            from utils import get_client_ip
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Honeypot field '{honeypot}' was filled from IP: {get_client_ip()}")
-            raise BadRequest("Invalid form submission")
+    check_honeypot(data)
     
     # Validate email
     if not validate_email(data['email'].strip()):
@@ -259,12 +386,12 @@ def validate_booking_update_data(data: dict) -> dict:
     
     # Validate status values
     if 'status' in update_data:
-        if update_data['status'] not in Config.VALID_BOOKING_STATUSES:
-            raise BadRequest(f"Invalid status. Allowed: {', '.join(Config.VALID_BOOKING_STATUSES)}")
+        if update_data['status'] not in _BOOKING_STATUSES:
+            raise BadRequest(f"Invalid status. Allowed: {_BOOKING_STATUSES_TEXT}")
     
     # Validate deposit_status values
     if 'deposit_status' in update_data:
-        if update_data['deposit_status'] not in Config.VALID_DEPOSIT_STATUSES:
-            raise BadRequest(f"Invalid deposit_status. Allowed: {', '.join(Config.VALID_DEPOSIT_STATUSES)}")
+        if update_data['deposit_status'] not in _DEPOSIT_STATUSES:
+            raise BadRequest(f"Invalid deposit_status. Allowed: {_DEPOSIT_STATUSES_TEXT}")
     
     return update_data